@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Test di carico: sessioni concorrenti di medici e pazienti sul backend.
+
+Uso:
+    SUPABASE_URL=... SUPABASE_KEY=... python benchmarks/bench_load.py \
+        [--sessioni 1 2 4 8 16] [--durata 30] [--medici 4] [--pazienti 5]
+
+Da eseguire su un progetto Supabase di prova: vengono creati medici e
+pazienti sintetici (username load_medico_*, codici fiscali LOADTEST*) con uno
+storico di misurazioni, cancellati alla fine salvo --mantieni-dati.
+
+Per ogni livello di concorrenza N partono N sessioni (metà medici, metà
+pazienti) su un solo Backend condiviso, come i rerun di Streamlit in un
+processo. Ogni sessione ripete il proprio percorso per --durata secondi:
+    medico:   login, panoramica, pazienti, storico, visita (con probabilità
+              --quota-visite, audio sintetico sempre diverso), nota
+    paziente: login, storico, statistiche
+Per ogni operazione si riportano throughput, latenze p50/p95/p99 ed errori
+(eccezioni, messaggi di on_error ed esiti negativi restituiti dal backend).
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from parkinson.backend import Backend
+
+PASSWORD = "load-test"
+MISURAZIONI_INIZIALI = 30   # Storico sintetico per paziente
+
+
+class Upload(io.BytesIO):
+    """File caricato come quelli di st.file_uploader"""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def synthetic_recording(rng, duration=3.0, sampling_frequency=44100):
+    """Vocale /a/ sintetica in WAV, diversa a ogni chiamata (nessun riuso dal memo)"""
+    t = np.arange(int(duration * sampling_frequency)) / sampling_frequency
+    f0 = rng.uniform(100, 220) * (1 + 0.02 * np.sin(2 * np.pi * 5 * t)) + rng.normal(0, 0.5, t.size)
+    phase = 2 * np.pi * np.cumsum(f0) / sampling_frequency
+    voice = 0.2 * sum(np.sin(k * phase) / k ** 1.2 for k in range(1, 20)) + 0.004 * rng.standard_normal(t.size)
+    out = io.BytesIO()
+    sf.write(out, voice, sampling_frequency, format="WAV")
+    return out.getvalue()
+
+
+# ==================== DATI DI PROVA ====================
+
+def seed(supabase, n_medici, n_pazienti):
+    """Medici, pazienti e storico sintetici; restituisce {medico: [codici fiscali]}"""
+    pw_hash = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    rng = random.Random(0)
+    clinics = {}
+    for i in range(n_medici):
+        username = f"load_medico_{i}"
+        supabase.table("doctors").upsert({
+            "username": username, "codice_fiscale": f"LOADMEDICO{i:06d}", "password_hash": pw_hash
+        }, on_conflict="username").execute()
+
+        cfs = [f"LOADTEST{i:04d}{j:04d}" for j in range(n_pazienti)]
+        supabase.table("patients").upsert([{
+            "codice_fiscale": cf, "nome": "Carico", "cognome": f"{i}-{j}", "password_hash": pw_hash,
+            "age": rng.randint(50, 85), "sex": rng.randint(0, 1), "doctor_username": username,
+            "baseline_date": datetime.now().isoformat()
+        } for j, cf in enumerate(cfs)], on_conflict="codice_fiscale").execute()
+
+        start = datetime.now() - timedelta(days=MISURAZIONI_INIZIALI * 7)
+        supabase.table("measurements").insert([{
+            "codice_fiscale": cf,
+            "timestamp": (start + timedelta(days=7 * k)).isoformat(),
+            "motor_updrs": round(15 + 0.2 * k + rng.gauss(0, 2), 2),
+            "jitter": 5e-5, "shimmer": 0.03, "hnr": 20.0, "nhr": 0.02, "dfa": 0.7, "ppe": 0.2
+        } for cf in cfs for k in range(MISURAZIONI_INIZIALI)]).execute()
+        clinics[username] = cfs
+    return clinics
+
+
+def cleanup(supabase, clinics, hashes):
+    """Cancella i dati sintetici (e le voci del memo create dalle visite)"""
+    cfs = [cf for cfs in clinics.values() for cf in cfs]
+    supabase.table("alerts").delete().in_("codice_fiscale", cfs).execute()
+    supabase.table("measurements").delete().in_("codice_fiscale", cfs).execute()
+    supabase.table("patients").delete().in_("codice_fiscale", cfs).execute()
+    supabase.table("doctors").delete().in_("username", list(clinics)).execute()
+    hashes = list(hashes)
+    for i in range(0, len(hashes), 200):
+        supabase.table("feature_memo").delete().in_("audio_hash", hashes[i:i + 200]).execute()
+
+
+# ==================== SESSIONI ====================
+
+def failed(result):
+    """Esito negativo restituito dal backend: None, (None, errore) o (False, messaggio)"""
+    if result is None:
+        return True
+    return isinstance(result, tuple) and (result[0] is None or result[0] is False)
+
+
+class Recorder:
+    """Latenze ed errori per operazione, condivisi tra le sessioni"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.hashes = set()
+
+    def on_error(self, message):
+        # Errori segnalati dal backend (on_error) durante l'operazione corrente
+        self.local.failed = True
+
+    def measure(self, op, fn, *args, **kwargs):
+        self.local.failed = False
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            result = None
+        self.local.failed = self.local.failed or failed(result)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies[op].append(elapsed)
+            self.errors[op] += self.local.failed
+        return result
+
+
+def doctor_session(backend, rec, username, cfs, deadline, visit_share, seed_value):
+    rng = np.random.default_rng(seed_value)
+    while time.perf_counter() < deadline:
+        rec.measure("login medico", backend.login_doctor, username, PASSWORD)
+        rec.measure("panoramica", backend.get_doctor_overview, username)
+        rec.measure("pazienti", backend.get_patients, username)
+        cf = cfs[rng.integers(len(cfs))]
+        _, history, _ = rec.measure("storico", backend.get_history_page, cf) or (None, None, 0)
+        if rng.random() < visit_share:
+            result = rec.measure(
+                "visita", backend.process_visit, cf,
+                {"vocale": Upload(synthetic_recording(rng), "vocale.wav")}, token=os.urandom(8).hex()
+            )
+            if result and result[0]:
+                with rec.lock:
+                    rec.hashes.update(t["audio_hash"] for t in result[0]["task_features"].values())
+        if history:
+            rec.measure("nota", backend.add_note, cf, history[0]["timestamp"], "Nota di carico", username)
+
+
+def patient_session(backend, rec, cf, deadline):
+    while time.perf_counter() < deadline:
+        rec.measure("login paziente", backend.login_patient, cf, PASSWORD)
+        rec.measure("storico", backend.get_history_page, cf)
+        rec.measure("statistiche", backend.get_patient_stats, cf)
+
+
+def run_level(backend, rec, clinics, n_sessions, duration, visit_share):
+    """N sessioni concorrenti per `duration` secondi; restituisce il tempo effettivo"""
+    doctors = list(clinics)
+    patients = [cf for cfs in clinics.values() for cf in cfs]
+    deadline = time.perf_counter() + duration
+    threads = []
+    for i in range(n_sessions):
+        if i % 2 == 0:
+            username = doctors[(i // 2) % len(doctors)]
+            target, args = doctor_session, (backend, rec, username, clinics[username], deadline, visit_share, i)
+        else:
+            target, args = patient_session, (backend, rec, patients[(i // 2) % len(patients)], deadline)
+        threads.append(threading.Thread(target=target, args=args, daemon=True))
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def report(n_sessions, rec, elapsed):
+    print(f"\n=== {n_sessions} sessioni ({elapsed:.1f} s) ===")
+    print(f"{'operazione':<16}{'n':>7}{'op/s':>9}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'errori':>8}")
+    total = 0
+    for op in sorted(rec.latencies):
+        ms = np.asarray(rec.latencies[op]) * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        total += ms.size
+        print(
+            f"{op:<16}{ms.size:>7}{ms.size / elapsed:>9.1f}"
+            f"{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}{rec.errors[op]:>8}"
+        )
+    print(f"{'totale':<16}{total:>7}{total / elapsed:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessioni", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="Livelli di concorrenza da misurare")
+    parser.add_argument("--durata", type=float, default=30, help="Secondi per livello")
+    parser.add_argument("--medici", type=int, default=4)
+    parser.add_argument("--pazienti", type=int, default=5, help="Pazienti per medico")
+    parser.add_argument("--quota-visite", type=float, default=0.1,
+                        help="Probabilità di una visita a ogni giro di una sessione medico")
+    parser.add_argument("--workers", type=int, default=None, help="Processi per l'analisi audio")
+    parser.add_argument("--mantieni-dati", action="store_true", help="Non cancellare i dati sintetici")
+    args = parser.parse_args()
+
+    from supabase import create_client
+
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    print(f"Dati di prova: {args.medici} medici x {args.pazienti} pazienti, "
+          f"{MISURAZIONI_INIZIALI} misurazioni ciascuno")
+    clinics = seed(supabase, args.medici, args.pazienti)
+
+    hashes = set()
+    with tempfile.TemporaryDirectory() as archive_dir:
+        backend = Backend(supabase, archive_dir=archive_dir, workers=args.workers)
+        try:
+            for n_sessions in args.sessioni:
+                rec = Recorder()
+                backend.on_error = rec.on_error
+                elapsed = run_level(backend, rec, clinics, n_sessions, args.durata, args.quota_visite)
+                report(n_sessions, rec, elapsed)
+                hashes |= rec.hashes
+        finally:
+            backend.pool.shutdown()
+            if not args.mantieni_dati:
+                cleanup(supabase, clinics, hashes)
+
+
+if __name__ == "__main__":
+    main()
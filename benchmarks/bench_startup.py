@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark avvio a freddo: tempo di import dei moduli e prima pagina dell'app.
+
+Uso:
+    python benchmarks/bench_startup.py [--ripetizioni N]
+
+Ogni misura è eseguita in un interprete nuovo (nessun modulo in cache).
+La prima pagina (selezione ruolo) è misurata con streamlit.testing per
+ciascuna pagina (front2.0.py e divisioneruoli.py): tempo dall'avvio
+dell'interprete alla fine del primo run.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PAGES = ["front2.0.py", "divisioneruoli.py"]
+
+MODULES = [
+    "streamlit", "numpy", "pandas", "plotly.graph_objects", "parselmouth",
+    "soundfile", "supabase", "parkinson.features", "parkinson.archive"
+]
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+FIRST_PAINT_SNIPPET = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("{page}", default_timeout=60).run()
+elapsed = time.perf_counter() - start
+assert not app.exception, app.exception
+heavy = [m for m in ("parselmouth", "plotly", "numpy", "pandas", "supabase") if m in __import__("sys").modules]
+print(elapsed, ",".join(heavy))
+"""
+
+
+def run_snippet(snippet):
+    """Esegue lo snippet in un interprete nuovo; None se fallisce"""
+    result = subprocess.run(
+        [sys.executable, "-c", snippet], cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ripetizioni", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'modulo':<24}{'import (ms)':>14}")
+    for module in MODULES:
+        times = []
+        for _ in range(args.ripetizioni):
+            out = run_snippet(IMPORT_SNIPPET.format(module=module))
+            if out is None:
+                break
+            times.append(float(out))
+        if times:
+            print(f"{module:<24}{statistics.median(times) * 1000:>14.0f}")
+        else:
+            print(f"{module:<24}{'non disponibile':>14}")
+
+    for page in PAGES:
+        times, heavy = [], ""
+        for _ in range(args.ripetizioni):
+            out = run_snippet(FIRST_PAINT_SNIPPET.format(page=page))
+            if out is None:
+                break
+            elapsed, _, heavy = out.partition(" ")
+            times.append(float(elapsed))
+        if times:
+            print(f"\n{page} - prima pagina (selezione ruolo): {statistics.median(times) * 1000:.0f} ms")
+            print(f"Moduli pesanti caricati: {heavy or 'nessuno'}")
+        else:
+            print(f"\n{page} - prima pagina: streamlit non disponibile o errore nell'app")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Moduli condivisi del sistema di Telemonitoring Parkinson"""
@@ -0,0 +1,209 @@
+"""
+Allerte sui pazienti critici, valutate all'inserimento di ogni misurazione.
+
+Le regole confrontano una metrica della misurazione (motor_updrs, variazione
+rispetto al baseline o una feature vocale) con una soglia. Per ogni paziente e
+regola esiste al più un'allerta aperta (resolved_at nullo): viene creata quando
+la regola scatta, aggiornata alle misurazioni successive che la violano ancora
+e chiusa alla prima misurazione che non la viola più.
+La dashboard legge le allerte aperte del medico con una sola query indicizzata.
+
+Dopo l'introduzione della tabella, o dopo una rianalisi che cambia gli UPDRS,
+le allerte si ricalcolano dall'ultima misurazione di ogni paziente con:
+    SUPABASE_URL=... SUPABASE_KEY=... python -m parkinson.alerts
+"""
+
+import operator
+import os
+from datetime import datetime
+
+ALERTS_TABLE = "alerts"
+CHUNK = 200   # Codici fiscali per richiesta (limite di lunghezza URL di PostgREST)
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+# Soglie della vecchia overview del medico
+DEFAULT_RULES = [
+    {
+        "name": "updrs_elevato", "metric": "motor_updrs", "op": ">", "threshold": 30,
+        "message": "UPDRS motorio oltre {threshold}"
+    },
+    {
+        "name": "peggioramento", "metric": "variazione", "op": ">", "threshold": 10,
+        "message": "Peggioramento di oltre {threshold} punti dal baseline"
+    },
+]
+
+
+def validate_rules(rules):
+    """Regole come lista di dict; ValueError se una regola è incompleta o ha un operatore ignoto"""
+    rules = [dict(rule) for rule in rules]
+    for rule in rules:
+        missing = {"name", "metric", "op", "threshold"} - rule.keys()
+        if missing:
+            raise ValueError(f"Regola di allerta incompleta ({', '.join(sorted(missing))}): {rule}")
+        if rule["op"] not in OPERATORS:
+            raise ValueError(f"Operatore non valido nella regola {rule['name']}: {rule['op']}")
+    return rules
+
+
+def measurement_metrics(measurement, baseline_updrs=None):
+    """Metriche valutabili di una misurazione: colonne numeriche e variazione dal baseline"""
+    metrics = {k: v for k, v in measurement.items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+    updrs = measurement.get("motor_updrs")
+    if updrs is not None:
+        baseline = baseline_updrs if baseline_updrs is not None else updrs
+        metrics["variazione"] = float(updrs) - float(baseline)
+    return metrics
+
+
+def evaluate_rules(rules, metrics):
+    """Regole violate: {nome regola: (regola, valore)}"""
+    fired = {}
+    for rule in rules:
+        value = metrics.get(rule["metric"])
+        if value is not None and OPERATORS[rule["op"]](float(value), rule["threshold"]):
+            fired[rule["name"]] = (rule, float(value))
+    return fired
+
+
+def alert_message(name, rule, value):
+    """Messaggio della regola violata, con soglia e valore ({threshold}, {value})"""
+    return rule.get("message", name).format(**{**rule, "value": value})
+
+
+def fetch_open_alerts(supabase, codici_fiscali):
+    """Allerte aperte dei pazienti indicati: {codice fiscale: {regola: id}}"""
+    codici_fiscali = list(codici_fiscali)
+    found = {}
+    for i in range(0, len(codici_fiscali), CHUNK):
+        response = supabase.table(ALERTS_TABLE).select("id, codice_fiscale, rule").in_(
+            "codice_fiscale", codici_fiscali[i:i + CHUNK]
+        ).is_("resolved_at", "null").execute()
+        for row in response.data:
+            found.setdefault(row["codice_fiscale"], {})[row["rule"]] = row["id"]
+    return found
+
+
+def sync_alerts(supabase, patient, measurement, rules, open_alerts):
+    """
+    Allinea le allerte del paziente all'ultima misurazione.
+    patient: riga patients (codice_fiscale, doctor_username, baseline_updrs);
+    measurement: riga measurements appena inserita (con id);
+    open_alerts: {regola: id} delle allerte già aperte del paziente.
+    Restituisce i messaggi delle regole violate.
+    """
+    metrics = measurement_metrics(measurement, patient.get("baseline_updrs"))
+    fired = evaluate_rules(rules, metrics)
+    now = datetime.now().isoformat()
+
+    rows = {}
+    for name, (rule, value) in fired.items():
+        rows[name] = {
+            "codice_fiscale": patient["codice_fiscale"],
+            "doctor_username": patient["doctor_username"],
+            "measurement_id": measurement.get("id"),
+            "rule": name,
+            "message": alert_message(name, rule, value),
+            "value": value,
+            "threshold": rule["threshold"],
+            "motor_updrs": metrics.get("motor_updrs"),
+            "variazione": metrics.get("variazione")
+        }
+
+    # Nuove allerte, aggiornamento di quelle ancora valide, chiusura delle altre
+    # (updated_at è impostato dal database, trigger set_updated_at)
+    new = [row for name, row in rows.items() if name not in open_alerts]
+    if new:
+        supabase.table(ALERTS_TABLE).insert(new).execute()
+
+    still_open = [{**row, "id": open_alerts[name]} for name, row in rows.items() if name in open_alerts]
+    if still_open:
+        supabase.table(ALERTS_TABLE).upsert(still_open).execute()
+
+    resolved = [alert_id for name, alert_id in open_alerts.items() if name not in rows]
+    if resolved:
+        supabase.table(ALERTS_TABLE).update({"resolved_at": now}).in_("id", resolved).execute()
+
+    return [rows[name]["message"] for name in sorted(rows)]
+
+
+def open_alerts_for_doctor(supabase, doctor_username):
+    """Allerte aperte dei pazienti del medico, con nome del paziente (indice alerts_doctor_username_open_idx)"""
+    return supabase.table(ALERTS_TABLE).select(
+        "id, codice_fiscale, rule, message, motor_updrs, variazione, updated_at, patients(nome, cognome)"
+    ).eq("doctor_username", doctor_username).is_("resolved_at", "null").order(
+        "updated_at", desc=True
+    ).execute().data
+
+
+def critical_patients(alerts):
+    """Allerte raggruppate per paziente, in ordine di UPDRS decrescente"""
+    by_patient = {}
+    for alert in alerts:
+        patient = alert.get("patients") or {}
+        entry = by_patient.setdefault(alert["codice_fiscale"], {
+            "nome": f"{patient.get('nome', '')} {patient.get('cognome', '')}".strip() or alert["codice_fiscale"],
+            "codice_fiscale": alert["codice_fiscale"],
+            "ultimo_updrs": alert["motor_updrs"],
+            "variazione": alert["variazione"],
+            "allerte": []
+        })
+        entry["allerte"].append(alert["message"] or alert["rule"])
+    return sorted(by_patient.values(), key=lambda p: p["ultimo_updrs"] or 0, reverse=True)
+
+
+# ==================== RICALCOLO ====================
+
+def latest_measurements(supabase, codici_fiscali, page_size=1000):
+    """Ultima misurazione di ciascun paziente (a pagine: PostgREST limita le righe per risposta)"""
+    latest = {}
+    offset = 0
+    while True:
+        page = supabase.table("measurements").select("*").in_(
+            "codice_fiscale", codici_fiscali
+        ).order("codice_fiscale").order("timestamp", desc=True).range(
+            offset, offset + page_size - 1
+        ).execute().data
+        for m in page:
+            latest.setdefault(m["codice_fiscale"], m)
+        if len(page) < page_size:
+            return latest
+        offset += page_size
+
+
+def backfill(supabase, rules=DEFAULT_RULES, page_size=1000):
+    """Ricalcola le allerte di tutti i pazienti dalla loro ultima misurazione"""
+    rules = validate_rules(rules)
+    last_id, n_patients, n_fired = 0, 0, 0
+    while True:
+        patients = supabase.table("patients").select(
+            "id, codice_fiscale, doctor_username, baseline_updrs"
+        ).gt("id", last_id).order("id").limit(page_size).execute().data
+
+        for i in range(0, len(patients), CHUNK):
+            chunk = {p["codice_fiscale"]: p for p in patients[i:i + CHUNK]}
+            latest = latest_measurements(supabase, list(chunk), page_size)
+
+            open_alerts = fetch_open_alerts(supabase, chunk)
+            for cf, patient in chunk.items():
+                if cf in latest:
+                    n_fired += bool(sync_alerts(supabase, patient, latest[cf], rules, open_alerts.get(cf, {})))
+
+        n_patients += len(patients)
+        print(f"Pazienti elaborati: {n_patients} - con allerte aperte: {n_fired}", flush=True)
+
+        if len(patients) < page_size:
+            return n_fired
+        last_id = patients[-1]["id"]
+
+
+def main():
+    from supabase import create_client
+
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    backfill(supabase)
+
+
+if __name__ == "__main__":
+    main()
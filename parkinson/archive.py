@@ -0,0 +1,92 @@
+"""Archivio delle registrazioni indirizzato per contenuto (hash SHA-256)"""
+
+import hashlib
+import io
+import os
+import tempfile
+from pathlib import Path
+
+# Sottotipi WAV convertibili in FLAC senza perdita -> sottotipo FLAC
+# (FLAC non ha campioni senza segno: l'8 bit unsigned è allargato a 16 bit)
+FLAC_SUBTYPES = {"PCM_S8": "PCM_S8", "PCM_U8": "PCM_16", "PCM_16": "PCM_16", "PCM_24": "PCM_24"}
+
+
+def audio_hash(data):
+    """Hash SHA-256 del contenuto caricato"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def shard_dir(root, digest):
+    """Directory a due livelli (ab/cd/) per non avere milioni di file in una cartella"""
+    return Path(root) / digest[:2] / digest[2:4]
+
+
+def find_recording(root, digest):
+    """Percorso della registrazione archiviata, None se assente"""
+    directory = shard_dir(root, digest)
+    if not directory.is_dir():
+        return None
+    for path in directory.glob(f"{digest}.*"):
+        if not path.name.endswith(".tmp"):
+            return path
+    return None
+
+
+def _compress(data, filename):
+    """
+    Compressione lossless: i WAV PCM interi diventano FLAC,
+    i formati già compressi (FLAC, Ogg, Opus) sono salvati così come sono.
+    """
+    ext = Path(filename or "").suffix.lower().lstrip(".") or "wav"
+    if ext != "wav":
+        return data, ext
+
+    import soundfile as sf
+
+    try:
+        info = sf.info(io.BytesIO(data))
+        if info.format != "WAV" or info.subtype not in FLAC_SUBTYPES:
+            return data, ext
+
+        samples, sampling_frequency = sf.read(io.BytesIO(data), dtype="int32", always_2d=True)
+        out = io.BytesIO()
+        sf.write(out, samples, sampling_frequency, format="FLAC", subtype=FLAC_SUBTYPES[info.subtype])
+        return out.getvalue(), "flac"
+    except Exception:
+        # La compressione è un'ottimizzazione: se fallisce si archivia il file originale
+        return data, ext
+
+
+def store_recording(root, data, filename=None):
+    """
+    Archivia la registrazione una sola volta sotto il suo hash.
+    Restituisce (hash, nuova) dove nuova è False se era già presente.
+    """
+    digest = audio_hash(data)
+    if find_recording(root, digest) is not None:
+        return digest, False
+
+    payload, ext = _compress(data, filename)
+    directory = shard_dir(root, digest)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    # Scrittura atomica: upload concorrenti dello stesso file non lasciano file parziali
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(payload)
+        os.replace(tmp_path, directory / f"{digest}.{ext}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return digest, True
+
+
+def archive_stats(root):
+    """Numero di registrazioni uniche e spazio occupato (byte)"""
+    files = [p for p in Path(root).glob("*/*/*") if p.is_file() and not p.name.endswith(".tmp")]
+    return {
+        "n_registrazioni": len(files),
+        "byte_totali": sum(p.stat().st_size for p in files)
+    }
@@ -0,0 +1,295 @@
+"""
+Stadi di pre-elaborazione del segnale audio prima dell'analisi Praat.
+
+numpy è importato dentro le funzioni: il modulo (costanti ed eccezioni) è
+caricato anche dalla pagina iniziale, tramite il backend.
+"""
+
+from parkinson.protocol import SUPPORTED_FORMATS  # noqa: F401 (riesportato)
+
+
+# ==================== DECODIFICA ====================
+
+DECODE_BLOCK_FRAMES = 65536
+
+
+def decode_audio(source, block_frames=DECODE_BLOCK_FRAMES):
+    """
+    Decodifica WAV/FLAC/Ogg (Vorbis/Opus) a blocchi direttamente nel buffer
+    di analisi, senza file WAV intermedio. `source` può essere un percorso
+    o un oggetto file (es. l'UploadedFile di Streamlit).
+    Il downmix a mono avviene blocco per blocco.
+    Restituisce (campioni mono float64, frequenza di campionamento).
+    """
+    # numpy e libsndfile caricati solo alla prima decodifica
+    import numpy as np
+    import soundfile as sf
+
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+    with sf.SoundFile(source) as audio:
+        sampling_frequency = audio.samplerate
+        # Buffer preallocato dalla durata dichiarata nell'header; eventuali
+        # campioni in eccesso (header inesatto) finiscono in blocchi separati
+        buffer = np.empty(max(audio.frames, 0), dtype=np.float64)
+        filled = 0
+        overflow = []
+
+        for block in audio.blocks(blocksize=block_frames, dtype="float64", always_2d=True):
+            mono = block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+            if not overflow and filled + len(mono) <= len(buffer):
+                buffer[filled:filled + len(mono)] = mono
+                filled += len(mono)
+            else:
+                overflow.append(mono)
+
+    samples = np.concatenate([buffer[:filled]] + overflow) if overflow else buffer[:filled]
+    return samples, float(sampling_frequency)
+
+
+# ==================== NORMALIZZAZIONE ====================
+
+# Frequenza di analisi: con pitch 75-500 Hz e HNR (cc) 16 kHz conserva tutta
+# la banda utile (fino a 8 kHz) e riduce i campioni di 2.75-3x rispetto a 44.1/48 kHz
+ANALYSIS_SAMPLE_RATE = 16000
+RESAMPLE_PRECISION = 50    # Campioni per lato della sinc di Praat
+
+
+def normalize_sound(sound, sampling_frequency=ANALYSIS_SAMPLE_RATE):
+    """
+    Converte in mono e ricampiona alla frequenza di analisi.
+    Il ricampionamento avviene solo verso il basso: file già a frequenza
+    inferiore non vengono sovracampionati.
+    """
+    if sound.n_channels > 1:
+        sound = sound.convert_to_mono()
+    if sampling_frequency and sound.sampling_frequency > sampling_frequency:
+        sound = sound.resample(sampling_frequency, RESAMPLE_PRECISION)
+    return sound
+
+
+# ==================== VOICE ACTIVITY DETECTION ====================
+
+VAD_FRAME_MS = 20          # Durata finestra per il calcolo dell'energia
+VAD_THRESHOLD_DB = -35.0   # Soglia rispetto alla finestra più energetica
+VAD_MIN_PAUSE_MS = 250     # Pause più brevi vengono mantenute (non spezzano la voce)
+VAD_PADDING_MS = 40        # Margine mantenuto attorno a ogni segmento vocalizzato
+
+
+def frame_energy_db(samples, frame_len):
+    """Energia RMS in dB per finestre non sovrapposte (vettorizzata)"""
+    import numpy as np
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.empty(0)
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    return 20.0 * np.log10(rms + 1e-12)
+
+
+def detect_voiced_segments(samples, sampling_frequency,
+                           frame_ms=VAD_FRAME_MS,
+                           threshold_db=VAD_THRESHOLD_DB,
+                           min_pause_ms=VAD_MIN_PAUSE_MS,
+                           padding_ms=VAD_PADDING_MS):
+    """
+    Individua i segmenti vocalizzati con una VAD basata sull'energia.
+    Restituisce una lista di coppie (inizio, fine) in campioni.
+    """
+    import numpy as np
+    frame_len = max(1, int(round(sampling_frequency * frame_ms / 1000.0)))
+    energy = frame_energy_db(samples, frame_len)
+    if energy.size == 0:
+        return []
+
+    voiced = energy > (energy.max() + threshold_db)
+
+    # Chiude le pause brevi e allarga i segmenti del margine richiesto
+    pad = int(np.ceil(padding_ms / frame_ms))
+    max_gap = int(np.ceil(min_pause_ms / frame_ms))
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if starts.size == 0:
+        return []
+
+    keep = np.concatenate(([True], (starts[1:] - ends[:-1]) > max_gap))
+    starts = starts[keep]
+    ends = ends[np.concatenate((keep[1:], [True]))]
+
+    starts = np.maximum(starts - pad, 0) * frame_len
+    ends = np.minimum((ends + pad) * frame_len, len(samples))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def trim_silence(samples, sampling_frequency, **vad_params):
+    """
+    Rimuove il silenzio iniziale e finale dal segnale.
+    Le pause interne restano: unire i segmenti vocalizzati creerebbe salti di
+    periodo e ampiezza misurati da jitter e shimmer (soprattutto in DDK e
+    lettura), mentre nelle pause Praat non trova periodi.
+    Accetta un array (n_campioni) o (canali, n_campioni).
+    Restituisce il segnale ridotto e un dizionario con le durate
+    (durata_voce = somma dei segmenti vocalizzati).
+    """
+    import numpy as np
+    samples = np.asarray(samples)
+    mono = samples.mean(axis=0) if samples.ndim == 2 else samples
+    segments = detect_voiced_segments(mono, sampling_frequency, **vad_params)
+
+    durata_audio = mono.shape[-1] / sampling_frequency
+    if not segments:
+        return samples, {
+            "durata_audio": durata_audio,
+            "durata_voce": durata_audio,
+            "n_segmenti": 0
+        }
+
+    trimmed = samples[..., segments[0][0]:segments[-1][1]]
+
+    return trimmed, {
+        "durata_audio": durata_audio,
+        "durata_voce": sum(end - start for start, end in segments) / sampling_frequency,
+        "n_segmenti": len(segments)
+    }
+
+
+# ==================== CONTROLLO QUALITÀ ====================
+
+# Controllo rapido sui campioni decodificati, prima di creare oggetti Praat.
+# Le soglie non entrano nella versione di estrazione: decidono solo se una
+# registrazione viene analizzata, non il valore delle feature.
+QC_SILENT_DBFS = -50.0       # Finestra più energetica sotto questo livello: registrazione muta
+QC_LOW_DBFS = -35.0          # Livello basso (avviso)
+QC_CLIP_LEVEL = 0.999        # Campioni a fondo scala
+QC_CLIP_REJECT = 0.01        # Frazione di campioni saturati: rifiutata
+QC_CLIP_WARN = 0.001         # Frazione di campioni saturati: avviso
+QC_NOISE_PERCENTILE = 10     # Percentile dell'energia delle finestre non vocalizzate preso come rumore di fondo
+QC_MIN_NOISE_FRAMES = 5      # Finestre non vocalizzate necessarie per stimare il rumore
+QC_FRAME_MS = 40             # Finestra per periodicità (almeno due periodi a 75 Hz)
+QC_MAX_FRAMES = 400          # Finestre analizzate al massimo (equidistanti)
+QC_PERIODIC = 0.5            # Autocorrelazione normalizzata oltre cui la finestra è voce periodica
+QC_F0_RANGE = (75, 500)      # Lag cercati nell'autocorrelazione (come il pitch di Praat)
+
+# Soglie per task: DDK e lettura sono più lunghe, hanno pause e consonanti
+# non periodiche per natura (il rumore si stima bene nelle pause); la vocale
+# sostenuta può non avere pause e il rumore stimato include la voce stessa
+QC_TASK_THRESHOLDS = {
+    "vocale": {
+        "durata_min": 1.0,           # Registrazione più breve (s): rifiutata
+        "voce_min": 0.5,             # Voce (VAD) più breve (s): rifiutata
+        "snr_rifiuto": 3.0,          # Rapporto segnale/rumore (dB) sotto cui è rifiutata
+        "snr_avviso": 10.0,          # Rumore elevato (avviso)
+        "periodica_avviso": 0.5      # Frazione della voce periodica sotto cui avvisare
+    },
+    "ddk": {
+        "durata_min": 2.0, "voce_min": 1.0, "snr_rifiuto": 6.0, "snr_avviso": 15.0, "periodica_avviso": 0.2
+    },
+    "lettura": {
+        "durata_min": 3.0, "voce_min": 2.0, "snr_rifiuto": 6.0, "snr_avviso": 15.0, "periodica_avviso": 0.3
+    }
+}
+
+
+class AudioQualityError(ValueError):
+    """Registrazione non utilizzabile per l'analisi (motivi nel messaggio)"""
+
+
+def frame_periodicity(samples, sampling_frequency, frame_ms=QC_FRAME_MS,
+                      max_frames=QC_MAX_FRAMES, f0_range=QC_F0_RANGE):
+    """
+    Massimo dell'autocorrelazione normalizzata nel range di pitch, per finestra
+    (al più max_frames finestre equidistanti): vicino a 1 per voce periodica,
+    vicino a 0 per rumore. Restituisce (periodicità, energia in dB) per finestra.
+    """
+    import numpy as np
+    frame_len = max(1, int(round(sampling_frequency * frame_ms / 1000.0)))
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.empty(0), np.empty(0)
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+    if n_frames > max_frames:
+        frames = frames[np.linspace(0, n_frames - 1, max_frames).astype(int)]
+    frames = frames - frames.mean(axis=1, keepdims=True)
+
+    n_fft = 1 << (2 * frame_len - 1).bit_length()
+    spectrum = np.fft.rfft(frames * np.hanning(frame_len), n=n_fft, axis=1)
+    acf = np.fft.irfft(np.abs(spectrum) ** 2, n=n_fft, axis=1)[:, :frame_len]
+    # Correzione della finestra (come Praat): autocorrelazione della finestra stessa
+    window_acf = np.fft.irfft(np.abs(np.fft.rfft(np.hanning(frame_len), n=n_fft)) ** 2, n=n_fft)[:frame_len]
+
+    lo = int(sampling_frequency / f0_range[1])
+    hi = min(int(sampling_frequency / f0_range[0]), frame_len // 2)
+    energy = acf[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        normalized = (acf[:, lo:hi] / energy[:, None]) / (window_acf[lo:hi] / window_acf[0])
+    periodicity = np.nan_to_num(normalized.max(axis=1), nan=0.0).clip(0.0, 0.999)
+    energy_db = 10.0 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12)
+    return periodicity, energy_db
+
+
+def check_quality(samples, sampling_frequency, task="vocale"):
+    """
+    Controllo qualità in NumPy sui campioni grezzi (mono, float in [-1, 1])
+    con le soglie del task (QC_TASK_THRESHOLDS): durata, livello,
+    saturazione, durata della voce (VAD), rapporto segnale/rumore e frazione
+    di voce periodica. Restituisce un dict con le misure, "errori" (motivi per
+    rifiutare la registrazione) e "avvisi" (analisi possibile ma meno
+    affidabile).
+
+    Il rumore di fondo è l'energia delle finestre non vocalizzate (scartate
+    dalla VAD o non periodiche), non la periodicità della voce: una voce
+    disfonica (rauca, soffiata) ha poca periodicità ma non è rumore, e la
+    periodicità produce solo un avviso.
+    """
+    import numpy as np
+    soglie = QC_TASK_THRESHOLDS[task]
+    samples = np.asarray(samples, dtype=np.float64)
+    duration = len(samples) / sampling_frequency
+    errori, avvisi = [], []
+    report = {"durata": duration, "errori": errori, "avvisi": avvisi}
+
+    if duration < soglie["durata_min"]:
+        errori.append(f"registrazione troppo breve ({duration:.1f} s, minimo {soglie['durata_min']:.0f} s)")
+        return report
+
+    periodicity, energy_db = frame_periodicity(samples, sampling_frequency)
+    report["livello_db"] = level = float(energy_db.max())
+    if level < QC_SILENT_DBFS:
+        errori.append(f"registrazione muta o quasi ({level:.0f} dBFS)")
+        return report
+    if level < QC_LOW_DBFS:
+        avvisi.append(f"livello di registrazione basso ({level:.0f} dBFS)")
+
+    report["saturazione"] = clipped = float(np.mean(np.abs(samples) >= QC_CLIP_LEVEL))
+    if clipped > QC_CLIP_REJECT:
+        errori.append(f"audio saturato ({clipped:.1%} dei campioni a fondo scala)")
+    elif clipped > QC_CLIP_WARN:
+        avvisi.append(f"audio in parte saturato ({clipped:.2%} dei campioni a fondo scala)")
+
+    # Voce secondo la VAD a energia (come trim_silence), finestre equidistanti sulla durata
+    active = energy_db > level + VAD_THRESHOLD_DB
+    voice = float(np.mean(active)) * duration
+    if voice < soglie["voce_min"]:
+        errori.append(f"voce insufficiente ({voice:.1f} s di voce, minimo {soglie['voce_min']} s)")
+
+    # Rapporto segnale/rumore: energia mediana della voce contro il rumore di fondo
+    # delle finestre non vocalizzate (None se mancano, es. vocale senza pause)
+    periodic = periodicity > QC_PERIODIC
+    unvoiced = ~active | ~periodic
+    report["snr_db"] = snr = None
+    if np.count_nonzero(unvoiced) >= QC_MIN_NOISE_FRAMES:
+        noise_db = np.percentile(energy_db[unvoiced], QC_NOISE_PERCENTILE)
+        report["snr_db"] = snr = float(np.median(energy_db[active]) - noise_db)
+    if snr is not None and snr < soglie["snr_rifiuto"]:
+        errori.append(f"rumore paragonabile alla voce (rapporto segnale/rumore {snr:.0f} dB)")
+    elif snr is not None and snr < soglie["snr_avviso"]:
+        avvisi.append(f"rumore di fondo elevato (rapporto segnale/rumore {snr:.0f} dB)")
+
+    # Periodicità della voce: bassa per disfonia o rumore, solo un avviso
+    report["frazione_voce"] = periodica = float(np.mean(periodic[active]))
+    if periodica < soglie["periodica_avviso"]:
+        avvisi.append(f"voce poco periodica ({periodica:.0%} delle finestre di voce): misure meno affidabili")
+
+    return report
@@ -0,0 +1,648 @@
+"""
+Backend dell'applicazione: accesso al database, visite e analisi vocale.
+
+Nessuna dipendenza da Streamlit: le pagine (front2.0.py, divisioneruoli.py)
+creano un solo Backend per processo e ne chiamano i metodi a ogni rerun.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import cached_property
+
+from parkinson.alerts import (
+    DEFAULT_RULES, critical_patients, fetch_open_alerts, open_alerts_for_doctor, sync_alerts, validate_rules
+)
+from parkinson.archive import audio_hash, store_recording
+from parkinson.audio import ANALYSIS_SAMPLE_RATE, AudioQualityError
+from parkinson.baseline import anomalies, measurement_values
+from parkinson.features import (
+    VISIT_TASKS, compute_updrs, extract_features_from_bytes, extraction_version, feature_columns, primary_task
+)
+from parkinson.inflight import InFlightRegistry
+from parkinson.memo import get_memo, put_memo
+from parkinson.timing import NULL_TIMER, StageTimer, log_stages, record_metrics
+
+logger = logging.getLogger("parkinson.backend")
+
+# Aggregazioni dello storico calcolate nel database (funzione measurements_buckets)
+HISTORY_BUCKETS = {"giorno": "day", "settimana": "week", "mese": "month"}
+
+# Misurazioni per pagina nella tabella dello storico
+HISTORY_PAGE_SIZE = 20
+
+# Validità degli andamenti per medico nella panoramica (svuotati a ogni visita salvata)
+TRENDS_TTL_SECONDS = 300
+
+
+def visit_files(audio_files):
+    """{task: file} senza task vuoti (un singolo file è la vocale sostenuta)"""
+    if not isinstance(audio_files, dict):
+        audio_files = {"vocale": audio_files}
+    return {task: f for task, f in audio_files.items() if f is not None}
+
+
+def visit_task_features(per_task, hashes):
+    """Dettaglio per task salvato in measurements.task_features"""
+    return {
+        task: {**task_feats, "motor_updrs": task_updrs, "audio_hash": hashes[task]}
+        for task, (task_feats, task_updrs) in per_task.items()
+    }
+
+
+def visit_result(per_task, hashes, duplicati, allerte, anomalie, tempi):
+    """Risultato di una visita per l'interfaccia (feature del task principale)"""
+    principale = primary_task(per_task)
+    features, updrs = per_task[principale]
+    return {
+        "motor_UPDRS": updrs,
+        "jitter": features['jitter_abs'],
+        "shimmer": features['shimmer_local'],
+        "hnr": features['hnr'],
+        "nhr": features['nhr'],
+        "dfa": features['dfa'],
+        "ppe": features['ppe'],
+        "rpde": features.get('rpde'),
+        "spectral_tilt": features.get('spectral_tilt'),
+        "mfcc": features.get('mfcc'),
+        "durata_audio": features['durata_audio'],
+        "durata_voce": features['durata_voce'],
+        "audio_hash": hashes[principale],
+        "audio_duplicato": duplicati[principale],
+        "task_principale": principale,
+        "task_features": visit_task_features(per_task, hashes),
+        "allerte": allerte,
+        "anomalie": anomalie,
+        # Avvisi del controllo qualità (registrazioni analizzate ma meno affidabili)
+        "avvisi_qualita": [
+            f"{VISIT_TASKS[task]}: {avviso}"
+            for task, (task_feats, _) in per_task.items() for avviso in task_feats.get("avvisi_qualita", [])
+        ],
+        "tempi": tempi
+    }
+
+
+def visit_key(codice_fiscale, hashes, token=None):
+    """
+    Chiave di idempotenza di una visita: paziente, hash delle registrazioni per
+    task e token dell'invio. Senza token, le stesse registrazioni dello stesso
+    paziente sono sempre la stessa visita.
+    """
+    parts = [codice_fiscale.upper(), token or ""] + [f"{task}:{digest}" for task, digest in sorted(hashes.items())]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def stored_visit_result(measurement):
+    """Risultato di una visita già salvata, ricostruito dal dettaglio per task della misurazione"""
+    per_task, hashes = {}, {}
+    for task, task_feats in measurement["task_features"].items():
+        feats = {k: v for k, v in task_feats.items() if k not in ("motor_updrs", "audio_hash")}
+        per_task[task] = (feats, task_feats["motor_updrs"])
+        hashes[task] = task_feats["audio_hash"]
+    result = visit_result(per_task, hashes, {task: True for task in hashes}, [], [], [])
+    return {**result, "ripetuta": True}
+
+
+class Backend:
+    """
+    Operazioni dell'applicazione su un client Supabase.
+    on_error riceve i messaggi di errore da mostrare all'utente
+    (es. st.error); di default vengono solo registrati nel log.
+    """
+
+    def __init__(self, supabase, archive_dir="audio_archive", sampling_frequency=ANALYSIS_SAMPLE_RATE,
+                 workers=None, metrics_file=None, alert_rules=DEFAULT_RULES, on_error=None):
+        self.supabase = supabase
+        self.archive_dir = archive_dir
+        self.sampling_frequency = sampling_frequency
+        self.metrics_file = metrics_file
+        # Regole valutate a ogni misurazione inserita (vedi parkinson.alerts)
+        self.alert_rules = validate_rules(alert_rules)
+        self.on_error = on_error or logger.error
+        # Pool di processi per l'analisi audio (i worker partono al primo invio)
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self._pool_lock = threading.Lock()
+        # Visite in corso per chiave di idempotenza (doppi invii attendono la prima)
+        self.visits = InFlightRegistry()
+        # Andamenti UPDRS per medico: {username: (istante, andamenti)}
+        self._trends = {}
+
+    def _error(self, message):
+        self.on_error(message)
+
+    @cached_property
+    def extraction_version(self):
+        """
+        Versione di estrazione (codice + parametri) salvata con ogni misurazione.
+        Calcolata alla prima visita: i parametri vengono da moduli che caricano numpy.
+        """
+        return extraction_version(self.sampling_frequency)
+
+    def _restart_pool(self, broken):
+        """Sostituisce il pool rotto (worker terminato, es. per memoria esaurita); una volta sola per pool"""
+        with self._pool_lock:
+            if self.pool is broken:
+                logger.warning("Pool di analisi interrotto: riavvio dei worker")
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+                broken.shutdown(wait=False, cancel_futures=True)
+
+    def extract_vocal_features(self, recordings, timer=NULL_TIMER):
+        """
+        Estrae le feature vocali di una o più registrazioni in parallelo.
+        recordings: {task: bytes audio}.
+        I tempi misurati nei worker sono aggiunti a timer come "task/stadio".
+        Restituisce {task: feature} o None se errore; solleva AudioQualityError,
+        con il task nel messaggio, se una registrazione non supera il controllo qualità.
+        Se un worker muore il pool viene ricreato e l'analisi ripetuta una volta.
+        """
+        for tentativo in range(2):
+            pool = self.pool
+            try:
+                return self._extract_in(pool, recordings, timer)
+            except AudioQualityError:
+                raise
+            except BrokenProcessPool as e:
+                self._restart_pool(pool)
+                if tentativo:
+                    self._error(f"Errore analisi audio: {str(e)}")
+            except Exception as e:
+                self._error(f"Errore analisi audio: {str(e)}")
+                return None
+        return None
+
+    def _extract_in(self, pool, recordings, timer):
+        futures = {
+            task: pool.submit(extract_features_from_bytes, data, self.sampling_frequency, task)
+            for task, data in recordings.items()
+        }
+        features, stages = {}, {}
+        for task, future in futures.items():
+            try:
+                features[task], stages[task] = future.result()
+            except AudioQualityError as e:
+                for pending in futures.values():
+                    pending.cancel()
+                raise AudioQualityError(f"{VISIT_TASKS[task]}: {e}") from None
+        # Tempi aggiunti solo a estrazione completa (un tentativo fallito non lascia stadi)
+        for task in futures:
+            timer.extend(stages[task], prefix=f"{task}/")
+        return features
+
+    def login_doctor(self, username, password):
+        """Login medico"""
+        pw_hash = hashlib.sha256(password.encode()).hexdigest()
+        username_upper = username.upper()
+
+        try:
+            response = self.supabase.table("doctors").select("*").eq("username", username).eq("password_hash", pw_hash).execute()
+            if not response.data:
+                response = self.supabase.table("doctors").select("*").eq("codice_fiscale", username_upper).eq("password_hash", pw_hash).execute()
+
+            if response.data:
+                return response.data[0]
+            return None
+        except Exception as e:
+            self._error(f"Errore login: {str(e)}")
+            return None
+
+    def login_patient(self, codice_fiscale, password):
+        """Login paziente"""
+        pw_hash = hashlib.sha256(password.encode()).hexdigest()
+
+        try:
+            response = self.supabase.table("patients").select("*").eq(
+                "codice_fiscale", codice_fiscale.upper()
+            ).eq("password_hash", pw_hash).execute()
+
+            if response.data:
+                return response.data[0]
+            return None
+        except Exception as e:
+            self._error(f"Errore login: {str(e)}")
+            return None
+
+    def register_patient(self, codice_fiscale, nome, cognome, password, age, sex, doctor_username):
+        """Registra nuovo paziente"""
+        cf_upper = codice_fiscale.upper()
+
+        if not re.match(r'^[A-Z0-9]{16}$', cf_upper):
+            return False, "Codice fiscale non valido"
+
+        pw_hash = hashlib.sha256(password.encode()).hexdigest()
+
+        try:
+            self.supabase.table("patients").insert({
+                "codice_fiscale": cf_upper,
+                "nome": nome,
+                "cognome": cognome,
+                "password_hash": pw_hash,
+                "age": age,
+                "sex": 1 if sex == "M" else 0,
+                "doctor_username": doctor_username,
+                "baseline_date": datetime.now().isoformat()
+            }).execute()
+
+            return True, f"Paziente {nome} {cognome} registrato"
+        except Exception as e:
+            if "duplicate" in str(e).lower():
+                return False, "Codice fiscale già registrato"
+            return False, str(e)
+
+    def get_patients(self, doctor_username):
+        """Lista pazienti del medico"""
+        try:
+            response = self.supabase.table("patients").select(
+                "codice_fiscale, nome, cognome, age, sex, doctor_username"
+            ).eq("doctor_username", doctor_username).execute()
+            return response.data
+        except Exception as e:
+            self._error(f"Errore caricamento pazienti: {str(e)}")
+            return []
+
+    def get_history(self, codice_fiscale, start=None, end=None, bucket=None, columns="*"):
+        """
+        Storico misurazioni paziente, dalle più recenti.
+        start/end: date o datetime dell'intervallo [start, end) (None = senza limite).
+        bucket ("giorno", "settimana", "mese"): misurazioni aggregate nel database,
+        una riga per periodo in ordine cronologico con timestamp di inizio, n,
+        media (motor_updrs, jitter, ...) e estremi (<feature>_min, <feature>_max).
+        columns: colonne delle misurazioni non aggregate.
+        """
+        cf_upper = codice_fiscale.upper()
+
+        try:
+            patient_response = self.supabase.table("patients").select("*").eq(
+                "codice_fiscale", cf_upper
+            ).execute()
+
+            if not patient_response.data:
+                return None, None
+
+            info = patient_response.data[0]
+
+            if bucket:
+                measurements_response = self.supabase.rpc("measurements_buckets", {
+                    "p_codice_fiscale": cf_upper,
+                    "p_bucket": HISTORY_BUCKETS[bucket],
+                    "p_from": start.isoformat() if start else None,
+                    "p_to": end.isoformat() if end else None
+                }).execute()
+                return info, measurements_response.data
+
+            query = self.supabase.table("measurements").select(columns).eq("codice_fiscale", cf_upper)
+            if start:
+                query = query.gte("timestamp", start.isoformat())
+            if end:
+                query = query.lt("timestamp", end.isoformat())
+            measurements_response = query.order("timestamp", desc=True).execute()  # CAMBIATO: desc=True per mostrare i più recenti prima
+
+            return info, measurements_response.data
+        except Exception as e:
+            self._error(f"Errore caricamento storico: {str(e)}")
+            return None, None
+
+    def get_history_page(self, codice_fiscale, start=None, bucket="mese", columns="*", page=0,
+                         page_size=HISTORY_PAGE_SIZE):
+        """
+        Storico per le pagine, di dimensione costante al crescere del monitoraggio:
+        (serie, righe, totale). serie: misurazioni aggregate per periodo (bucket) nel
+        database, per il grafico; righe: pagina page (0 = più recenti) di page_size
+        misurazioni con le colonne columns; totale: misurazioni nell'intervallo.
+        (None, None, 0) se errore.
+        """
+        cf_upper = codice_fiscale.upper()
+
+        try:
+            serie = self.supabase.rpc("measurements_buckets", {
+                "p_codice_fiscale": cf_upper,
+                "p_bucket": HISTORY_BUCKETS[bucket],
+                "p_from": start.isoformat() if start else None,
+                "p_to": None
+            }).execute().data
+
+            query = self.supabase.table("measurements").select(columns, count="exact").eq("codice_fiscale", cf_upper)
+            if start:
+                query = query.gte("timestamp", start.isoformat())
+            response = query.order("timestamp", desc=True).order("id", desc=True).range(
+                page * page_size, (page + 1) * page_size - 1
+            ).execute()
+
+            return serie, response.data, response.count or 0
+        except Exception as e:
+            self._error(f"Errore caricamento storico: {str(e)}")
+            return None, None, 0
+
+    def archive_recordings(self, audio_files):
+        """
+        Archivia le registrazioni (una sola copia per contenuto).
+        Restituisce ({task: bytes}, {task: hash}, {task: già presente}).
+        """
+        recordings, hashes, duplicati = {}, {}, {}
+        for task, audio_file in audio_files.items():
+            recordings[task] = audio_file.getvalue()
+            hashes[task], nuova = store_recording(
+                self.archive_dir, recordings[task], getattr(audio_file, "name", None)
+            )
+            duplicati[task] = not nuova
+        return recordings, hashes, duplicati
+
+    def process_visit(self, codice_fiscale, audio_files, token=None):
+        """
+        Processa visita con analisi vocale.
+        audio_files: {task: file} con uno o più task di VISIT_TASKS
+        (un singolo file è trattato come vocale sostenuta).
+        token: identificativo dell'invio del form (vedi visit_key); un invio
+        ripetuto con lo stesso token e le stesse registrazioni restituisce il
+        risultato della prima esecuzione, con "ripetuta": True.
+        """
+        cf_upper = codice_fiscale.upper()
+
+        audio_files = visit_files(audio_files)
+        if not audio_files:
+            return None, "Nessuna registrazione caricata"
+
+        return self.run_visit_once(
+            cf_upper, audio_files, token, lambda key: self._process_visit(cf_upper, audio_files, key)
+        )
+
+    def run_visit_once(self, cf_upper, audio_files, token, process):
+        """
+        Esegue process(key) una sola volta per chiave di idempotenza: gli invii
+        concorrenti o recenti con la stessa chiave ricevono lo stesso risultato
+        (gli errori non restano associati alla chiave e si possono riprovare).
+        """
+        key = visit_key(cf_upper, {task: audio_hash(f.getvalue()) for task, f in audio_files.items()}, token)
+        (result, error), eseguita = self.visits.run(key, lambda: process(key), keep=lambda r: r[0] is not None)
+        if result and not eseguita:
+            result = {**result, "ripetuta": True}
+        return result, error
+
+    def _process_visit(self, cf_upper, audio_files, key):
+        timer = StageTimer()
+        try:
+            # Verifica paziente
+            with timer.stage("paziente"):
+                patient_check = self.supabase.table("patients").select("*").eq(
+                    "codice_fiscale", cf_upper
+                ).execute()
+
+            if not patient_check.data:
+                return None, "Paziente non trovato"
+
+            # Visita già salvata con questa chiave (altro processo o dopo un riavvio)
+            with timer.stage("idempotenza"):
+                existing = self.supabase.table("measurements").select("*").eq("idempotency_key", key).execute()
+            if existing.data:
+                return stored_visit_result(existing.data[0]), None
+
+            with timer.stage("archivio"):
+                recordings, hashes, duplicati = self.archive_recordings(audio_files)
+
+            # Riusa i risultati delle registrazioni già analizzate
+            # con la stessa versione di estrazione
+            with timer.stage("memo"):
+                memo = get_memo(self.supabase, set(hashes.values()), self.extraction_version)
+            per_task = {task: memo[h] for task, h in hashes.items() if h in memo}
+
+            # Analisi in parallelo dei task restanti: la visita dura quanto il task più lento
+            da_analizzare = {task: recordings[task] for task in hashes if task not in per_task}
+            if da_analizzare:
+                with timer.stage("analisi"):
+                    try:
+                        estratte = self.extract_vocal_features(da_analizzare, timer)
+                    except AudioQualityError as e:
+                        return None, f"Registrazione non utilizzabile, da ripetere. {e}"
+                if not estratte:
+                    return None, "Errore nell'analisi audio"
+
+                with timer.stage("updrs"):
+                    nuovi = {}
+                    for task, task_feats in estratte.items():
+                        per_task[task] = (task_feats, compute_updrs(task_feats))
+                        nuovi[hashes[task]] = per_task[task]
+                with timer.stage("memo_scrittura"):
+                    put_memo(self.supabase, nuovi, self.extraction_version)
+
+            return self._save_visit(
+                patient_check.data[0], per_task, hashes, duplicati, timer, sorted(da_analizzare), key
+            )
+
+        except Exception as e:
+            return None, str(e)
+
+    def save_analyzed_visit(self, codice_fiscale, per_task, hashes, timestamp, key=None):
+        """
+        Salva una visita già analizzata altrove, es. senza connessione e inviata
+        dopo dalla coda di parkinson.mirror. per_task: {task: (feature, updrs)};
+        hashes: {task: hash}; timestamp: istante della visita (ISO);
+        key: chiave di idempotenza (un secondo invio non duplica la misurazione).
+        """
+        cf_upper = codice_fiscale.upper()
+        timer = StageTimer()
+        try:
+            with timer.stage("paziente"):
+                patient_check = self.supabase.table("patients").select("*").eq(
+                    "codice_fiscale", cf_upper
+                ).execute()
+
+            if not patient_check.data:
+                return None, "Paziente non trovato"
+
+            # I risultati vanno in memo come per un'analisi fatta qui
+            with timer.stage("memo_scrittura"):
+                put_memo(self.supabase, {hashes[task]: result for task, result in per_task.items()},
+                         self.extraction_version)
+
+            return self._save_visit(
+                patient_check.data[0], per_task, hashes, {task: True for task in hashes}, timer, [], key, timestamp
+            )
+
+        except Exception as e:
+            return None, str(e)
+
+    def _save_visit(self, patient, per_task, hashes, duplicati, timer, analizzati, key=None, timestamp=None):
+        """Salva la misurazione, aggiorna baseline personale e allerte del paziente e compone il risultato"""
+        cf_upper = patient["codice_fiscale"]
+
+        # Feature e UPDRS della misurazione dal task principale, dettaglio per task in JSON
+        principale = primary_task(per_task)
+        features, updrs = per_task[principale]
+
+        # Salva misurazione
+        with timer.stage("salvataggio"):
+            try:
+                inserted = self.supabase.table("measurements").insert({
+                    "codice_fiscale": cf_upper,
+                    "timestamp": timestamp or datetime.now().isoformat(),
+                    "motor_updrs": updrs,
+                    **feature_columns(features),
+                    "audio_hash": hashes[principale],
+                    "extraction_version": self.extraction_version,
+                    "task_features": visit_task_features(per_task, hashes),
+                    "idempotency_key": key,
+                    "note_medico": None
+                }).execute().data[0]
+            except Exception as e:
+                # Stessa chiave salvata nel frattempo da un altro processo (indice unico)
+                if key is None or "duplicate" not in str(e).lower():
+                    raise
+                existing = self.supabase.table("measurements").select("*").eq("idempotency_key", key).execute()
+                if not existing.data:
+                    raise
+                return stored_visit_result(existing.data[0]), None
+
+            # Andamenti del medico da ricalcolare alla prossima panoramica
+            self._trends.pop(patient.get("doctor_username"), None)
+
+            # Confronto con la baseline personale (statistiche delle visite precedenti)
+            valori = measurement_values(inserted)
+            anomalie = anomalies(patient.get("feature_stats"), valori)
+
+            # Campione aggiunto alle statistiche e baseline UPDRS se prima misurazione,
+            # calcolati nel database in un solo UPDATE (vedi add_feature_sample in
+            # schemadb.sql): visite concorrenti dello stesso paziente non si sovrascrivono
+            self.supabase.rpc("add_feature_sample", {
+                "p_codice_fiscale": cf_upper, "p_values": valori, "p_baseline_updrs": updrs
+            }).execute()
+
+        # Allerte del paziente aggiornate con la nuova misurazione
+        # (un errore qui non annulla la visita, già salvata)
+        allerte = []
+        with timer.stage("allerte"):
+            try:
+                allerte = sync_alerts(
+                    self.supabase,
+                    {**patient, "baseline_updrs": patient.get("baseline_updrs") or updrs},
+                    inserted,
+                    self.alert_rules,
+                    fetch_open_alerts(self.supabase, [cf_upper]).get(cf_upper, {})
+                )
+            except Exception as e:
+                self._error(f"Errore aggiornamento allerte: {str(e)}")
+
+        # Tempi per stadio: log strutturato e file di metriche
+        log_stages(
+            "visita", timer.stages, audio_hash=hashes[principale],
+            task=sorted(hashes), analizzati=analizzati
+        )
+        record_metrics(timer.stages, self.metrics_file)
+
+        return visit_result(per_task, hashes, duplicati, allerte, anomalie, timer.stages), None
+
+    def add_note(self, codice_fiscale, timestamp, note, doctor_username):
+        """Aggiungi nota del medico"""
+        cf_upper = codice_fiscale.upper()
+
+        try:
+            # Verifica autorizzazione
+            patient_check = self.supabase.table("patients").select("*").eq(
+                "codice_fiscale", cf_upper
+            ).eq("doctor_username", doctor_username).execute()
+
+            if not patient_check.data:
+                return False, "Non autorizzato"
+
+            # Aggiorna nota
+            self.supabase.table("measurements").update({
+                "note_medico": note
+            }).eq("codice_fiscale", cf_upper).eq("timestamp", timestamp).execute()
+
+            return True, "Nota salvata"
+        except Exception as e:
+            return False, str(e)
+
+    def get_patient_stats(self, codice_fiscale):
+        """Statistiche paziente, con andamento stimato su tutte le misurazioni (vedi parkinson.trends)"""
+        from parkinson.trends import COLUMNS, patient_trends
+
+        cf_upper = codice_fiscale.upper()
+
+        try:
+            measurements = self.supabase.table("measurements").select(", ".join(COLUMNS)).eq(
+                "codice_fiscale", cf_upper
+            ).execute()
+
+            trends = patient_trends(measurements.data)
+            if not trends:
+                return {
+                    "n_misurazioni": 0,
+                    "ultimo_updrs": None,
+                    "primo_updrs": None,
+                    "variazione": None,
+                    "mediana_mobile": None,
+                    "pendenza_mensile": None,
+                    "pendenza_theil_sen": None,
+                    "trend": None
+                }
+
+            return trends[0]
+        except Exception as e:
+            self._error(f"Errore statistiche: {str(e)}")
+            return None
+
+    def get_doctor_overview(self, doctor_username):
+        """
+        Overview per il medico: pazienti in carico, pazienti critici (con
+        allerte aperte) e andamento UPDRS di ogni paziente con misurazioni,
+        in ordine di pendenza decrescente (vedi doctor_trends)
+        """
+        try:
+            patients = self.supabase.table("patients").select("id", count="exact").eq(
+                "doctor_username", doctor_username
+            ).limit(1).execute()
+
+            alerts = open_alerts_for_doctor(self.supabase, doctor_username)
+
+            return {
+                "n_pazienti": patients.count or 0,
+                "pazienti_critici": critical_patients(alerts),
+                "andamenti": self.doctor_trends(doctor_username)
+            }
+        except Exception as e:
+            self._error(f"Errore overview: {str(e)}")
+            return None
+
+    def doctor_trends(self, doctor_username):
+        """
+        Andamenti UPDRS dei pazienti del medico. La lettura di tutte le
+        misurazioni (a pagine) avviene al più ogni TRENDS_TTL_SECONDS o dopo
+        una visita salvata da questo processo, non a ogni rerun della pagina.
+        """
+        from parkinson.trends import fetch_doctor_measurements, patient_trends
+
+        cached = self._trends.get(doctor_username)
+        if cached and time.monotonic() - cached[0] < TRENDS_TTL_SECONDS:
+            return cached[1]
+        trends = patient_trends(fetch_doctor_measurements(self.supabase, doctor_username))
+        self._trends[doctor_username] = (time.monotonic(), trends)
+        return trends
+
+    def reset_patient_password(self, doctor_username, codice_fiscale_paziente, new_password):
+        """Reset password paziente"""
+        cf_upper = codice_fiscale_paziente.upper()
+
+        try:
+            patient_check = self.supabase.table("patients").select("*").eq(
+                "codice_fiscale", cf_upper
+            ).eq("doctor_username", doctor_username).execute()
+
+            if not patient_check.data:
+                return False, "Paziente non trovato o non appartiene a questo medico"
+
+            pw_hash = hashlib.sha256(new_password.encode()).hexdigest()
+
+            self.supabase.table("patients").update({
+                "password_hash": pw_hash
+            }).eq("codice_fiscale", cf_upper).execute()
+
+            patient = patient_check.data[0]
+            return True, f"{patient['nome']} {patient['cognome']}"
+
+        except Exception as e:
+            return False, str(e)
@@ -0,0 +1,104 @@
+"""
+Baseline personale del paziente per feature, aggiornata a ogni visita.
+
+Per ogni paziente e feature (UPDRS e colonne vocali di measurements) la
+colonna patients.feature_stats contiene numero di misurazioni, media e somma
+dei quadrati degli scarti (algoritmo di Welford). Una nuova misurazione viene
+confrontata con la media e la deviazione standard del paziente in tempo
+costante, senza rileggere lo storico. Il campione è aggiunto nel database con
+la funzione add_feature_sample (schemadb.sql, stessa formula di update_stats)
+in un solo UPDATE, così due visite concorrenti dello stesso paziente non
+perdono l'aggiornamento l'una dell'altra.
+
+Dopo l'introduzione della colonna, o dopo una rianalisi che cambia le feature,
+le statistiche si ricalcolano dallo storico con:
+    SUPABASE_URL=... SUPABASE_KEY=... python -m parkinson.baseline
+"""
+
+import math
+import os
+
+FEATURES = ["motor_updrs", "jitter", "shimmer", "hnr", "nhr", "dfa", "ppe", "rpde", "spectral_tilt"]
+
+MIN_SAMPLES = 3     # Misurazioni precedenti necessarie prima di segnalare anomalie
+Z_THRESHOLD = 3.0   # Scarto dalla media, in deviazioni standard, oltre cui la misurazione è insolita
+
+
+def measurement_values(measurement):
+    """Valori numerici delle feature seguite (le mancanti sono ignorate)"""
+    values = {}
+    for feature in FEATURES:
+        value = measurement.get(feature)
+        if value is not None and math.isfinite(float(value)):
+            values[feature] = float(value)
+    return values
+
+
+def update_stats(stats, values):
+    """Nuove statistiche dopo l'aggiunta di una misurazione (aggiornamento di Welford)"""
+    stats = dict(stats or {})
+    for feature, x in values.items():
+        s = stats.get(feature) or {"n": 0, "mean": 0.0, "m2": 0.0}
+        n = s["n"] + 1
+        delta = x - s["mean"]
+        mean = s["mean"] + delta / n
+        stats[feature] = {"n": n, "mean": mean, "m2": s["m2"] + delta * (x - mean)}
+    return stats
+
+
+def anomalies(stats, values, threshold=Z_THRESHOLD, min_samples=MIN_SAMPLES):
+    """
+    Feature della misurazione lontane dalla baseline del paziente (statistiche
+    precedenti alla misurazione): lista di dict feature, valore, media,
+    dev_std, z, in ordine di |z| decrescente.
+    """
+    found = []
+    for feature, x in values.items():
+        s = (stats or {}).get(feature)
+        if not s or s["n"] < min_samples:
+            continue
+        std = math.sqrt(s["m2"] / (s["n"] - 1))
+        if std == 0:
+            continue
+        z = (x - s["mean"]) / std
+        if abs(z) > threshold:
+            found.append({"feature": feature, "valore": x, "media": s["mean"], "dev_std": std, "z": z})
+    return sorted(found, key=lambda a: abs(a["z"]), reverse=True)
+
+
+# ==================== RICALCOLO ====================
+
+def rebuild(supabase, page_size=1000):
+    """Ricalcola feature_stats di tutti i pazienti con misurazioni, scorrendo measurements a pagine"""
+    stats = {}
+    offset = 0
+    while True:
+        page = supabase.table("measurements").select(
+            f"id, codice_fiscale, {', '.join(FEATURES)}"
+        ).order("codice_fiscale").order("timestamp").order("id").range(
+            offset, offset + page_size - 1
+        ).execute().data
+        for m in page:
+            stats[m["codice_fiscale"]] = update_stats(stats.get(m["codice_fiscale"]), measurement_values(m))
+        offset += len(page)
+        print(f"Misurazioni elaborate: {offset}", flush=True)
+        if len(page) < page_size:
+            break
+
+    for codice_fiscale, patient_stats in stats.items():
+        supabase.table("patients").update({"feature_stats": patient_stats}).eq(
+            "codice_fiscale", codice_fiscale
+        ).execute()
+    print(f"Pazienti aggiornati: {len(stats)}", flush=True)
+    return len(stats)
+
+
+def main():
+    from supabase import create_client
+
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    rebuild(supabase)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Grafici plotly delle dashboard (plotly importato solo quando si disegna)"""
+
+
+def plotly_go():
+    """plotly viene importato solo nelle pagine che disegnano grafici"""
+    try:
+        import plotly.graph_objects as go
+    except ImportError:
+        import plotly.graph_objs as go
+    return go
+
+
+def add_range_band(go, fig, df, color):
+    """Banda minimo-massimo dell'UPDRS per periodo (storico aggregato di get_history_page)"""
+    if 'motor_updrs_min' not in df:
+        return
+    fig.add_trace(go.Scatter(
+        x=list(df['timestamp']) + list(df['timestamp'])[::-1],
+        y=list(df['motor_updrs_max']) + list(df['motor_updrs_min'])[::-1],
+        fill='toself',
+        fillcolor=color,
+        opacity=0.2,
+        line=dict(width=0),
+        name='Min - Max',
+        hoverinfo='skip'
+    ))
+
+
+def create_updrs_trend_chart_simple(df):
+    """Grafico UPDRS semplificato per paziente - SENZA zone colorate"""
+    go = plotly_go()
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=df['timestamp'],
+        y=df['motor_updrs'],
+        mode='lines+markers',
+        name='UPDRS Motorio',
+        line=dict(color='#4A90E2', width=4),
+        marker=dict(size=10, color='#4A90E2'),
+        hovertemplate='<b>Data</b>: %{x|%d/%m/%Y}<br><b>UPDRS</b>: %{y:.1f}<extra></extra>'
+    ))
+    add_range_band(go, fig, df, '#4A90E2')
+
+    fig.update_layout(
+        title={
+            'text': "Andamento del tuo UPDRS nel Tempo",
+            'font': {'size': 20, 'color': '#333'}
+        },
+        xaxis_title="Data",
+        yaxis_title="Punteggio UPDRS",
+        hovermode='closest',
+        height=450,
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(size=14),
+        xaxis=dict(showgrid=True, gridcolor='#E0E0E0'),
+        yaxis=dict(showgrid=True, gridcolor='#E0E0E0')
+    )
+
+    return fig
+
+
+def create_updrs_trend_chart_medico(df):
+    """Grafico UPDRS per medico - CON zone colorate"""
+    go = plotly_go()
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=df['timestamp'],
+        y=df['motor_updrs'],
+        mode='lines+markers',
+        name='UPDRS Motorio',
+        line=dict(color='#1f77b4', width=3),
+        marker=dict(size=8)
+    ))
+    add_range_band(go, fig, df, '#1f77b4')
+
+    # Zone di riferimento clinico
+    fig.add_hrect(y0=0, y1=20, fillcolor="green", opacity=0.1, line_width=0, annotation_text="Lieve")
+    fig.add_hrect(y0=20, y1=40, fillcolor="yellow", opacity=0.1, line_width=0, annotation_text="Moderato")
+    fig.add_hrect(y0=40, y1=108, fillcolor="red", opacity=0.1, line_width=0, annotation_text="Severo")
+
+    fig.update_layout(
+        title="Evoluzione UPDRS Motorio nel Tempo",
+        xaxis_title="Data",
+        yaxis_title="Punteggio UPDRS",
+        hovermode='x unified',
+        height=400
+    )
+
+    return fig
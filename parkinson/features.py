@@ -0,0 +1,222 @@
+"""Estrazione delle feature vocali con Praat (parselmouth)"""
+
+import hashlib
+import io
+import json
+
+from parkinson import audio
+from parkinson.timing import NULL_TIMER, StageTimer
+from parkinson.audio import (
+    ANALYSIS_SAMPLE_RATE, AudioQualityError, check_quality, decode_audio, normalize_sound, trim_silence
+)
+from parkinson.protocol import VISIT_TASKS, primary_task  # noqa: F401 (riesportati)
+
+# Incrementare a ogni modifica del codice di estrazione o della formula UPDRS
+# che non sia già catturata dai parametri qui sotto
+CODE_VERSION = 5
+
+PITCH_FLOOR = 75
+PITCH_CEILING = 500
+
+# Valori di riferimento calibrati per ottenere distribuzione realistica
+UPDRS_MEANS = {
+    'jitter_abs': 0.00008, 'shimmer_local': 0.040, 'nhr': 0.035,
+    'hnr': 20.0, 'dfa': 0.750, 'ppe': 0.200
+}
+UPDRS_STDS = {
+    'jitter_abs': 0.00012, 'shimmer_local': 0.030, 'nhr': 0.060,
+    'hnr': 6.0, 'dfa': 0.100, 'ppe': 0.150
+}
+UPDRS_BASELINE = 10.0
+UPDRS_WEIGHTS = {
+    'jitter_abs': 1.8, 'shimmer_local': 1.5, 'nhr': 1.2,
+    'hnr': -1.0, 'dfa': 1.0, 'ppe': 0.8
+}
+
+
+def extraction_params(sampling_frequency=ANALYSIS_SAMPLE_RATE):
+    """Tutti i parametri che influenzano feature e UPDRS"""
+    # Import locale: frames e measures caricano numpy, non serve all'avvio dell'app
+    from parkinson import frames, measures
+
+    return {
+        "sampling_frequency": sampling_frequency,
+        "resample_precision": audio.RESAMPLE_PRECISION,
+        "vad": {
+            "frame_ms": audio.VAD_FRAME_MS,
+            "threshold_db": audio.VAD_THRESHOLD_DB,
+            "min_pause_ms": audio.VAD_MIN_PAUSE_MS,
+            "padding_ms": audio.VAD_PADDING_MS
+        },
+        "dfa": {
+            "min_scale_ms": measures.DFA_MIN_SCALE_MS,
+            "max_scale_ms": measures.DFA_MAX_SCALE_MS,
+            "n_scales": measures.DFA_N_SCALES
+        },
+        "ppe": {
+            "ar_order": measures.PPE_AR_ORDER,
+            "range_semitones": measures.PPE_RANGE_SEMITONES,
+            "bins": measures.PPE_BINS
+        },
+        "rpde": {
+            "dimension": measures.RPDE_DIMENSION,
+            "delay_ms": measures.RPDE_DELAY_MS,
+            "epsilon": measures.RPDE_EPSILON,
+            "t_max_ms": measures.RPDE_T_MAX_MS,
+            "n_points": measures.RPDE_N_POINTS
+        },
+        "frames": {"frame_ms": frames.FRAME_MS, "hop_ms": frames.HOP_MS},
+        "mfcc": {
+            "n_filters": measures.MFCC_N_FILTERS,
+            "n_coeffs": measures.MFCC_N_COEFFS,
+            "fmin": measures.MFCC_FMIN
+        },
+        "tilt_fmin": measures.TILT_FMIN,
+        "extractors": sorted(frames.FEATURE_EXTRACTORS),
+        "pitch_floor": PITCH_FLOOR,
+        "pitch_ceiling": PITCH_CEILING,
+        "updrs": {
+            "means": UPDRS_MEANS,
+            "stds": UPDRS_STDS,
+            "baseline": UPDRS_BASELINE,
+            "weights": UPDRS_WEIGHTS
+        }
+    }
+
+
+def extraction_version(sampling_frequency=ANALYSIS_SAMPLE_RATE):
+    """
+    Identificativo della versione di estrazione (codice + parametri),
+    es. "v1-3f2a9c01d4e5". Salvato con ogni misurazione.
+    """
+    payload = json.dumps(extraction_params(sampling_frequency), sort_keys=True)
+    digest = hashlib.sha256(payload.encode()).hexdigest()[:12]
+    return f"v{CODE_VERSION}-{digest}"
+
+
+def analyze_sound(sound, timer=NULL_TIMER):
+    """
+    Calcola le feature vocali su un parselmouth.Sound già pre-elaborato:
+    jitter, shimmer e HNR/NHR con Praat, le altre con gli estrattori registrati
+    in parkinson.frames sulla cache di frame condivisa.
+    """
+    # Import locale: Praat viene caricato solo da chi analizza audio
+    # (worker e flusso visita), non all'avvio dell'app
+    import parselmouth
+
+    from parkinson.frames import FrameCache, run_extractors
+
+    with timer.stage("point_process"):
+        point_process = parselmouth.praat.call(sound, "To PointProcess (periodic, cc)", PITCH_FLOOR, PITCH_CEILING)
+
+    with timer.stage("jitter"):
+        jitter_abs = parselmouth.praat.call(
+            point_process, "Get jitter (local, absolute)", 0, 0, 0.0001, 0.02, 1.3
+        )
+
+    with timer.stage("shimmer"):
+        shimmer_local = parselmouth.praat.call(
+            [sound, point_process], "Get shimmer (local)", 0, 0, 0.0001, 0.02, 1.3, 1.6
+        )
+
+    with timer.stage("harmonicity"):
+        harmonicity = parselmouth.praat.call(sound, "To Harmonicity (cc)", 0.01, PITCH_FLOOR, 0.1, 1.0)
+        hnr = parselmouth.praat.call(harmonicity, "Get mean", 0, 0)
+        nhr = 1.0 / (hnr + 1e-6) if hnr > 0 else 1.0
+
+    # Contorno di pitch come array (0 nei frame non vocalizzati), calcolato una volta
+    with timer.stage("pitch"):
+        pitch = sound.to_pitch(time_step=0.01, pitch_floor=PITCH_FLOOR, pitch_ceiling=PITCH_CEILING)
+        cache = FrameCache(
+            sound.values[0], sound.sampling_frequency,
+            f0=pitch.selected_array['frequency']
+        )
+
+    return {
+        'jitter_abs': float(jitter_abs),
+        'shimmer_local': float(shimmer_local),
+        'hnr': float(hnr),
+        'nhr': float(nhr),
+        **run_extractors(cache, timer=timer)
+    }
+
+
+def extract_features(audio_source, sampling_frequency=ANALYSIS_SAMPLE_RATE, timer=NULL_TIMER, task="vocale"):
+    """
+    Pipeline completa: decodifica, controllo qualità (con le soglie del task
+    del protocollo), mono + ricampionamento, VAD, feature Praat. Solleva
+    AudioQualityError per registrazioni non utilizzabili (prima di qualsiasi
+    elaborazione Praat) e altre eccezioni in caso di errore (gestite dal
+    chiamante). Gli avvisi del controllo qualità sono restituiti in
+    features['avvisi_qualita'].
+    """
+    import parselmouth
+
+    with timer.stage("decode"):
+        samples, source_frequency = decode_audio(audio_source)
+
+    # Registrazioni brevi, mute, saturate o rumorose scartate in pochi millisecondi
+    with timer.stage("qualita"):
+        qualita = check_quality(samples, source_frequency, task)
+    if qualita["errori"]:
+        raise AudioQualityError("; ".join(qualita["errori"]))
+
+    # Mono + ricampionamento alla frequenza di analisi
+    with timer.stage("resample"):
+        sound = parselmouth.Sound(samples, sampling_frequency=source_frequency)
+        sound = normalize_sound(sound, sampling_frequency)
+
+    # VAD: silenzio iniziale e finale rimosso (pause interne mantenute)
+    with timer.stage("vad"):
+        voiced, durate = trim_silence(sound.values, sound.sampling_frequency)
+        sound = parselmouth.Sound(voiced, sampling_frequency=sound.sampling_frequency)
+
+    features = analyze_sound(sound, timer)
+    features['durata_audio'] = float(durate['durata_audio'])
+    features['durata_voce'] = float(durate['durata_voce'])
+    features['avvisi_qualita'] = qualita["avvisi"]
+    return features
+
+
+def extract_features_from_bytes(data, sampling_frequency=ANALYSIS_SAMPLE_RATE, task="vocale"):
+    """
+    Come extract_features, su un upload in memoria (usata dai processi worker).
+    Restituisce (feature, stadi) con i tempi misurati nel worker.
+    """
+    timer = StageTimer()
+    features = extract_features(io.BytesIO(data), sampling_frequency, timer, task)
+    return features, timer.stages
+
+
+def compute_updrs(features):
+    """Calcola UPDRS con normalizzazione - Formula calibrata per risultati realistici e variabili"""
+
+    # Normalizzazione z-score
+    norm = {
+        name: (features[name] - UPDRS_MEANS[name]) / UPDRS_STDS[name]
+        for name in UPDRS_WEIGHTS
+    }
+
+    # Formula calibrata per distribuire i punteggi su tutto il range
+    # Baseline ridotto da 15 a 10 per permettere punteggi sotto i 20;
+    # pesi ridotti (jitter 2.5->1.8, shimmer 2.2->1.5, nhr 1.8->1.2,
+    # hnr -1.5->-1.0, dfa 1.6->1.0, ppe 1.4->0.8)
+    updrs = UPDRS_BASELINE + sum(UPDRS_WEIGHTS[name] * norm[name] for name in UPDRS_WEIGHTS)
+
+    # Limita il range tra 0 e 108 (scala UPDRS)
+    return max(0.0, min(108.0, round(updrs, 2)))
+
+
+def feature_columns(features):
+    """Mappa le feature sulle colonne della tabella measurements"""
+    return {
+        "jitter": features['jitter_abs'],
+        "shimmer": features['shimmer_local'],
+        "hnr": features['hnr'],
+        "nhr": features['nhr'],
+        "dfa": features['dfa'],
+        "ppe": features['ppe'],
+        "rpde": features.get('rpde'),
+        "spectral_tilt": features.get('spectral_tilt'),
+        "mfcc": features.get('mfcc')
+    }
@@ -0,0 +1,105 @@
+"""
+Cache dell'analisi a livello di frame e registro degli estrattori di feature.
+
+Il segnale viene suddiviso in frame, trasformato (STFT) e accompagnato dal
+contorno di pitch una sola volta per registrazione; ogni estrattore registrato
+con @feature_extractor riceve la stessa FrameCache e legge solo ciò che gli serve.
+Le grandezze sono calcolate al primo accesso e poi riutilizzate.
+"""
+
+from functools import cached_property
+
+import numpy as np
+
+from parkinson import measures
+from parkinson.timing import NULL_TIMER
+
+FRAME_MS = 25
+HOP_MS = 10
+
+
+class FrameCache:
+    """Analisi condivisa di una registrazione (segnale, frame, spettro, pitch)"""
+
+    def __init__(self, signal, sampling_frequency, f0=None, frame_ms=FRAME_MS, hop_ms=HOP_MS):
+        self.signal = np.asarray(signal, dtype=np.float64)
+        self.sampling_frequency = float(sampling_frequency)
+        self.f0 = np.empty(0) if f0 is None else np.asarray(f0, dtype=np.float64)
+        self.frame_len = max(1, int(round(sampling_frequency * frame_ms / 1000.0)))
+        self.hop = max(1, int(round(sampling_frequency * hop_ms / 1000.0)))
+        self.n_fft = 1 << (self.frame_len - 1).bit_length()
+
+    @cached_property
+    def frames(self):
+        """Frame sovrapposti come vista strided (nessuna copia)"""
+        if len(self.signal) < self.frame_len:
+            return np.empty((0, self.frame_len))
+        return np.lib.stride_tricks.sliding_window_view(self.signal, self.frame_len)[::self.hop]
+
+    @cached_property
+    def windowed(self):
+        return self.frames * np.hamming(self.frame_len)
+
+    @cached_property
+    def magnitude(self):
+        """Modulo della STFT (frame, n_fft // 2 + 1)"""
+        return np.abs(np.fft.rfft(self.windowed, n=self.n_fft, axis=1))
+
+    @cached_property
+    def power(self):
+        return self.magnitude ** 2
+
+    @cached_property
+    def freqs(self):
+        return np.fft.rfftfreq(self.n_fft, 1.0 / self.sampling_frequency)
+
+
+# ==================== REGISTRO ESTRATTORI ====================
+
+FEATURE_EXTRACTORS = {}
+
+
+def feature_extractor(name):
+    """Registra un estrattore: funzione (FrameCache) -> {nome_feature: valore}"""
+    def decorator(func):
+        FEATURE_EXTRACTORS[name] = func
+        return func
+    return decorator
+
+
+def run_extractors(cache, names=None, timer=NULL_TIMER):
+    """
+    Esegue gli estrattori registrati (o solo quelli indicati) sulla stessa cache.
+    Il tempo di ogni estrattore include le grandezze della cache che calcola per primo.
+    """
+    features = {}
+    for name, func in FEATURE_EXTRACTORS.items():
+        if names is None or name in names:
+            with timer.stage(name):
+                features.update(func(cache))
+    return features
+
+
+@feature_extractor("dfa")
+def _dfa(cache):
+    return {"dfa": measures.dfa(cache.signal, cache.sampling_frequency)}
+
+
+@feature_extractor("ppe")
+def _ppe(cache):
+    return {"ppe": measures.ppe(cache.f0)}
+
+
+@feature_extractor("rpde")
+def _rpde(cache):
+    return {"rpde": measures.rpde(cache.signal, cache.sampling_frequency)}
+
+
+@feature_extractor("mfcc")
+def _mfcc(cache):
+    return {"mfcc": measures.mfcc(cache.power, cache.n_fft, cache.sampling_frequency)}
+
+
+@feature_extractor("spectral_tilt")
+def _spectral_tilt(cache):
+    return {"spectral_tilt": measures.spectral_tilt(cache.power, cache.freqs)}
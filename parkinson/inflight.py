@@ -0,0 +1,75 @@
+"""
+Esecuzioni in corso per chiave di idempotenza.
+
+Un doppio invio del form di visita, o un rerun mentre l'analisi è in corso,
+arriva al backend con la stessa chiave: la seconda chiamata attende
+l'esecuzione già avviata e ne riceve il risultato invece di ripetere analisi
+e salvataggio. I risultati restano associati alla chiave per `ttl` secondi.
+Il registro è per processo: tra processi diversi la chiave è protetta
+dall'indice unico su measurements.idempotency_key.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+IDEMPOTENCY_TTL = 15 * 60   # Secondi per cui un risultato resta associato alla sua chiave
+
+
+class InFlightRegistry:
+    """Una sola esecuzione per chiave; le chiamate concorrenti ne condividono il risultato"""
+
+    def __init__(self, ttl=IDEMPOTENCY_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}   # chiave -> [future, istante di completamento o None se in corso]
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [k for k, (_, done_at) in self._entries.items() if done_at and now - done_at > self.ttl]:
+            del self._entries[key]
+
+    def _forget(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def in_flight(self):
+        """Numero di esecuzioni in corso"""
+        with self._lock:
+            return sum(done_at is None for _, done_at in self._entries.values())
+
+    def run(self, key, fn, keep=lambda result: True):
+        """
+        Esegue fn() se nessuna esecuzione con la stessa chiave è in corso o
+        recente, altrimenti ne attende il risultato. keep(result) decide se il
+        risultato resta associato alla chiave (es. non gli errori, da poter
+        riprovare). Restituisce (risultato, eseguita qui).
+        """
+        while True:
+            with self._lock:
+                self._expire()
+                entry = self._entries.get(key)
+                if entry is None:
+                    future = Future()
+                    self._entries[key] = [future, None]
+                    break
+            try:
+                return entry[0].result(), False
+            except BaseException:
+                # Esecuzione interrotta (es. rerun della sessione che la possedeva): si riprova
+                continue
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._forget(key)
+            future.set_exception(e)
+            raise
+
+        if keep(result):
+            with self._lock:
+                self._entries[key][1] = time.monotonic()
+        else:
+            self._forget(key)
+        future.set_result(result)
+        return result, True
@@ -0,0 +1,214 @@
+"""Misure di disfonia calcolate con NumPy sul segnale e sul contorno di pitch"""
+
+import numpy as np
+
+
+def normalized_entropy(counts, n_states):
+    """Entropia di Shannon di un istogramma, normalizzata in [0, 1] su n_states stati"""
+    p = counts[counts > 0] / counts.sum()
+    return float(abs(np.sum(p * np.log(p))) / np.log(n_states))
+
+
+# ==================== DFA ====================
+
+# Scale in ms (indipendenti dalla frequenza di campionamento), spaziate logaritmicamente
+DFA_MIN_SCALE_MS = 1.0
+DFA_MAX_SCALE_MS = 10.0
+DFA_N_SCALES = 12
+
+
+def dfa_scales(sampling_frequency, n_samples,
+               min_scale_ms=DFA_MIN_SCALE_MS, max_scale_ms=DFA_MAX_SCALE_MS, n_scales=DFA_N_SCALES):
+    """Dimensioni delle finestre (in campioni), uniche e con almeno 4 finestre per scala"""
+    low = max(4, int(round(sampling_frequency * min_scale_ms / 1000.0)))
+    high = min(int(round(sampling_frequency * max_scale_ms / 1000.0)), n_samples // 4)
+    if high <= low:
+        return np.empty(0, dtype=int)
+    return np.unique(np.geomspace(low, high, n_scales).astype(int))
+
+
+def fluctuation(profile, scale):
+    """
+    Fluttuazione F(n) su finestre non sovrapposte di lunghezza `scale`:
+    detrending lineare ai minimi quadrati di tutte le finestre insieme.
+    """
+    n_windows = len(profile) // scale
+    windows = profile[:n_windows * scale].reshape(n_windows, scale)
+
+    # Retta di regressione in forma chiusa, stessa ascissa per ogni finestra
+    t = np.arange(scale, dtype=np.float64)
+    t -= t.mean()
+    centered = windows - windows.mean(axis=1, keepdims=True)
+    slopes = centered @ t / (t @ t)
+    residuals = centered - slopes[:, None] * t
+
+    return np.sqrt(np.mean(residuals ** 2))
+
+
+def dfa(signal, sampling_frequency):
+    """
+    Detrended fluctuation analysis del segnale vocale.
+    Esponente di scala alfa (pendenza log-log di F(n) rispetto a n),
+    riportato in (0, 1) con la sigmoide 1 / (1 + exp(-alfa)) come nella
+    letteratura sul telemonitoraggio del Parkinson.
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    scales = dfa_scales(sampling_frequency, len(signal))
+    if len(scales) < 2:
+        return 0.0
+
+    profile = np.cumsum(signal - signal.mean())
+    fluctuations = np.array([fluctuation(profile, scale) for scale in scales])
+
+    valid = fluctuations > 0
+    if valid.sum() < 2:
+        return 0.0
+    alpha = np.polyfit(np.log(scales[valid]), np.log(fluctuations[valid]), 1)[0]
+    return float(1.0 / (1.0 + np.exp(-alpha)))
+
+
+# ==================== PPE ====================
+
+PPE_AR_ORDER = 2           # Ordine del filtro di predizione lineare (whitening)
+PPE_RANGE_SEMITONES = 6.0  # Istogramma dei residui su [-6, +6] semitoni
+PPE_BINS = 120
+
+
+def whiten(series, order=PPE_AR_ORDER):
+    """Residuo di predizione lineare AR(order) stimata ai minimi quadrati (sulla serie centrata)"""
+    series = series - series.mean()
+    if len(series) <= 2 * order:
+        return series
+    lagged = np.lib.stride_tricks.sliding_window_view(series[:-1], order)[:, ::-1]
+    target = series[order:]
+    coeffs, *_ = np.linalg.lstsq(lagged, target, rcond=None)
+    return target - lagged @ coeffs
+
+
+def ppe(f0):
+    """
+    Pitch period entropy (Little et al., 2009).
+    f0: contorno di pitch in Hz (frame non vocalizzati = 0 o NaN).
+    Il pitch è espresso in semitoni, centrato e sbiancato con un filtro di
+    predizione lineare; la PPE è l'entropia normalizzata (0-1) della
+    distribuzione dei residui. Un riferimento di pitch per sesso sposterebbe
+    solo la media del contorno, rimossa prima dello sbiancamento: la misura
+    non dipende dal sesso del paziente.
+    """
+    f0 = np.asarray(f0, dtype=np.float64)
+    f0 = f0[np.isfinite(f0) & (f0 > 0)]
+    if len(f0) <= 5:
+        return 0.0
+
+    semitones = 12.0 * np.log2(f0)
+    residuals = whiten(semitones)
+
+    counts, _ = np.histogram(
+        np.clip(residuals, -PPE_RANGE_SEMITONES, PPE_RANGE_SEMITONES),
+        bins=PPE_BINS, range=(-PPE_RANGE_SEMITONES, PPE_RANGE_SEMITONES)
+    )
+    return normalized_entropy(counts, PPE_BINS)
+
+
+# ==================== RPDE ====================
+
+RPDE_DIMENSION = 4         # Dimensione di embedding
+RPDE_DELAY_MS = 1.4        # Ritardo di embedding
+RPDE_EPSILON = 0.12        # Raggio della palla di ricorrenza (segnale normalizzato in [-1, 1])
+RPDE_T_MAX_MS = 40.0       # Tempo di ricorrenza massimo considerato
+RPDE_N_POINTS = 1000       # Punti di partenza campionati uniformemente
+
+
+def rpde(signal, sampling_frequency):
+    """
+    Recurrence period density entropy (Little et al., 2007).
+    Per un sottoinsieme di punti dello spazio delle fasi ricostruito, calcola in
+    blocco le distanze dai successivi T_max punti e il primo rientro nella palla
+    di raggio epsilon dopo esserne usciti; la RPDE è l'entropia normalizzata
+    della distribuzione dei tempi di ricorrenza.
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    peak = np.max(np.abs(signal)) if signal.size else 0.0
+    if peak == 0:
+        return 0.0
+    signal = signal / peak
+
+    delay = max(1, int(round(sampling_frequency * RPDE_DELAY_MS / 1000.0)))
+    t_max = int(round(sampling_frequency * RPDE_T_MAX_MS / 1000.0))
+    n_embedded = len(signal) - (RPDE_DIMENSION - 1) * delay
+    n_starts = n_embedded - t_max
+    if n_starts <= 0:
+        return 0.0
+
+    # Embedding come vista strided: riga i = (x[i], x[i+d], ..., x[i+(m-1)d])
+    embedded = np.lib.stride_tricks.sliding_window_view(
+        signal, (RPDE_DIMENSION - 1) * delay + 1
+    )[:n_embedded, ::delay]
+
+    starts = np.linspace(0, n_starts - 1, min(RPDE_N_POINTS, n_starts)).astype(int)
+    offsets = np.arange(1, t_max + 1)
+    trajectories = embedded[starts[:, None] + offsets]                # (punti, T_max, m)
+    distances = np.linalg.norm(trajectories - embedded[starts][:, None, :], axis=2)
+
+    inside = distances < RPDE_EPSILON
+    left = ~inside
+    has_left = left.any(axis=1)
+    first_exit = np.argmax(left, axis=1)
+    # Primo rientro successivo all'uscita
+    returned = inside & (offsets[None, :] > offsets[first_exit][:, None])
+    has_return = has_left & returned.any(axis=1)
+    periods = offsets[np.argmax(returned, axis=1)][has_return]
+    if periods.size == 0:
+        return 0.0
+
+    return normalized_entropy(np.bincount(periods, minlength=t_max + 1)[1:], t_max)
+
+
+# ==================== SPETTRO: MFCC E TILT ====================
+
+MFCC_N_FILTERS = 26
+MFCC_N_COEFFS = 13
+MFCC_FMIN = 50.0
+TILT_FMIN = 100.0
+
+
+def mel_filterbank(n_filters, n_fft, sampling_frequency, fmin=MFCC_FMIN, fmax=None):
+    """Banco di filtri triangolari in scala mel, matrice (n_filters, n_fft // 2 + 1)"""
+    fmax = fmax or sampling_frequency / 2.0
+    mel = lambda f: 2595.0 * np.log10(1.0 + f / 700.0)
+    hz = lambda m: 700.0 * (10.0 ** (m / 2595.0) - 1.0)
+
+    edges = hz(np.linspace(mel(fmin), mel(fmax), n_filters + 2))
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sampling_frequency)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (freqs - lower) / (center - lower)
+    falling = (upper - freqs) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling))
+
+
+def dct_matrix(n_coeffs, n_inputs):
+    """Matrice DCT-II ortonormale (n_coeffs, n_inputs)"""
+    n = np.arange(n_inputs)
+    k = np.arange(n_coeffs)[:, None]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2 * n_inputs)) * np.sqrt(2.0 / n_inputs)
+    basis[0] /= np.sqrt(2.0)
+    return basis
+
+
+def mfcc(power, n_fft, sampling_frequency, n_filters=MFCC_N_FILTERS, n_coeffs=MFCC_N_COEFFS):
+    """MFCC medi sui frame, da uno spettro di potenza (frame, n_fft // 2 + 1)"""
+    if len(power) == 0:
+        return [0.0] * n_coeffs
+    energies = power @ mel_filterbank(n_filters, n_fft, sampling_frequency).T
+    log_energies = np.log(energies + 1e-10)
+    coeffs = log_energies @ dct_matrix(n_coeffs, n_filters).T
+    return coeffs.mean(axis=0).tolist()
+
+
+def spectral_tilt(power, freqs, fmin=TILT_FMIN):
+    """Pendenza (dB/ottava) della retta di regressione dello spettro medio in dB"""
+    if len(power) == 0:
+        return 0.0
+    band = freqs >= fmin
+    spectrum_db = 10.0 * np.log10(power[:, band].mean(axis=0) + 1e-12)
+    return float(np.polyfit(np.log2(freqs[band]), spectrum_db, 1)[0])
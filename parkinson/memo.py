@@ -0,0 +1,35 @@
+"""Memoizzazione dei risultati di estrazione per (hash audio, versione)"""
+
+MEMO_TABLE = "feature_memo"
+MEMO_CHUNK = 200   # Hash per richiesta (limite di lunghezza URL di PostgREST)
+
+
+def get_memo(supabase, digests, version):
+    """
+    Risultati già calcolati con questa versione.
+    Restituisce {hash: (feature, updrs)} per gli hash presenti.
+    """
+    digests = list(digests)
+    found = {}
+    for i in range(0, len(digests), MEMO_CHUNK):
+        response = supabase.table(MEMO_TABLE).select(
+            "audio_hash, features, motor_updrs"
+        ).eq("extraction_version", version).in_("audio_hash", digests[i:i + MEMO_CHUNK]).execute()
+        for row in response.data:
+            found[row["audio_hash"]] = (row["features"], row["motor_updrs"])
+    return found
+
+
+def put_memo(supabase, results, version):
+    """Salva in blocco i risultati: results è {hash: (feature, updrs)}"""
+    rows = [
+        {
+            "audio_hash": digest,
+            "extraction_version": version,
+            "features": features,
+            "motor_updrs": updrs
+        }
+        for digest, (features, updrs) in results.items()
+    ]
+    if rows:
+        supabase.table(MEMO_TABLE).upsert(rows).execute()
@@ -0,0 +1,592 @@
+"""
+Copia locale (SQLite) dei dati di un ambulatorio, per connessioni instabili.
+
+MirroredBackend espone gli stessi metodi di Backend:
+- le letture (pazienti, storico, statistiche, overview) sono servite dal file
+  SQLite locale, senza attendere Supabase;
+- sync() scarica solo le righe di pazienti, misurazioni e allerte del medico
+  modificate dopo l'ultima sincronizzazione (watermark su updated_at,
+  aggiornato dal trigger set_updated_at del database);
+- le scritture (visite e note) fatte senza connessione, o fallite perché la
+  connessione è caduta dopo l'ultimo controllo, restano in una coda locale
+  e sono inviate in ordine alla prima sincronizzazione riuscita.
+  Una visita offline viene comunque analizzata subito (l'analisi è locale) e
+  compare nello storico come misurazione provvisoria fino all'invio.
+
+Controllo della connessione e sincronizzazione girano in un thread in
+background (start), con una propria connessione SQLite: i rerun delle pagine
+leggono solo lo stato già noto e non attendono la rete.
+
+Le righe cancellate su Supabase non vengono rimosse dalla copia locale
+(l'applicazione non cancella pazienti né misurazioni).
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from parkinson.alerts import alert_message, critical_patients, evaluate_rules, measurement_metrics
+from parkinson.audio import AudioQualityError
+from parkinson.backend import HISTORY_PAGE_SIZE, visit_files, visit_result, visit_task_features
+from parkinson.baseline import FEATURES, anomalies, measurement_values
+from parkinson.features import compute_updrs, feature_columns, primary_task
+from parkinson.timing import StageTimer
+
+logger = logging.getLogger("parkinson.mirror")
+
+PAGE_SIZE = 1000
+SYNC_SECONDS = 60    # Intervallo minimo tra due sincronizzazioni dello stesso medico
+CHECK_SECONDS = 15   # Intervallo tra due controlli di connessione del thread in background
+MAX_PARAMS = 500     # Parametri per query SQLite (limite di 999 nelle versioni precedenti alla 3.32)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doctors (
+    username TEXT PRIMARY KEY, codice_fiscale TEXT NOT NULL, password_hash TEXT NOT NULL, data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS patients (
+    codice_fiscale TEXT PRIMARY KEY, doctor_username TEXT NOT NULL, password_hash TEXT, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS patients_doctor_username_idx ON patients (doctor_username);
+CREATE TABLE IF NOT EXISTS measurements (
+    id INTEGER PRIMARY KEY, codice_fiscale TEXT NOT NULL, timestamp TEXT NOT NULL, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS measurements_codice_fiscale_timestamp_idx ON measurements (codice_fiscale, timestamp);
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY, doctor_username TEXT NOT NULL, data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    doctor_username TEXT NOT NULL, tabella TEXT NOT NULL, updated_at TEXT NOT NULL,
+    PRIMARY KEY (doctor_username, tabella)
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL,
+    created_at TEXT NOT NULL, error TEXT
+);
+"""
+
+# Inizio del periodo in SQLite, come date_trunc in measurements_buckets
+BUCKET_SQL = {
+    "giorno": "date(timestamp)",
+    "settimana": "date(timestamp, 'weekday 0', '-6 days')",
+    "mese": "strftime('%Y-%m-01', timestamp)"
+}
+
+
+def _dumps(row):
+    return json.dumps(row, default=float)
+
+
+def _select(rows, columns):
+    """Solo le colonne richieste (come select di PostgREST su una lista "a, b, c")"""
+    if columns == "*":
+        return rows
+    names = [c.strip() for c in columns.split(",")]
+    return [{c: row.get(c) for c in names} for row in rows]
+
+
+class LocalStore:
+    """File SQLite con righe Supabase in JSON e le sole colonne usate come chiave o filtro"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        # Una connessione per processo, condivisa dalle sessioni Streamlit (thread)
+        self.lock = threading.Lock()
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, rows):
+        with self.lock, self.conn:
+            self.conn.executemany(sql, rows)
+
+    # ---------- Righe remote ----------
+
+    def put_doctor(self, doctor):
+        self._write("INSERT OR REPLACE INTO doctors VALUES (?, ?, ?, ?)", [
+            (doctor["username"], doctor["codice_fiscale"], doctor["password_hash"], _dumps(doctor))
+        ])
+
+    def put_patients(self, rows):
+        self._write("INSERT OR REPLACE INTO patients VALUES (?, ?, ?, ?)", [
+            (p["codice_fiscale"], p["doctor_username"], p.get("password_hash"), _dumps(p)) for p in rows
+        ])
+
+    def put_measurements(self, rows):
+        self._write("INSERT OR REPLACE INTO measurements VALUES (?, ?, ?, ?)", [
+            (m["id"], m["codice_fiscale"], m["timestamp"], _dumps(m)) for m in rows
+        ])
+
+    def put_alerts(self, rows):
+        """Solo le allerte aperte: quelle chiuse vengono rimosse"""
+        self._write("DELETE FROM alerts WHERE id = ?", [(a["id"],) for a in rows if a.get("resolved_at")])
+        self._write("INSERT OR REPLACE INTO alerts VALUES (?, ?, ?)", [
+            (a["id"], a["doctor_username"], _dumps(a)) for a in rows if not a.get("resolved_at")
+        ])
+
+    def watermark(self, doctor_username, tabella):
+        rows = self._query(
+            "SELECT updated_at FROM watermarks WHERE doctor_username = ? AND tabella = ?", (doctor_username, tabella)
+        )
+        return rows[0][0] if rows else None
+
+    def set_watermark(self, doctor_username, tabella, updated_at):
+        self._write("INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?)", [(doctor_username, tabella, updated_at)])
+
+    def has_doctor_data(self, doctor_username):
+        return self.watermark(doctor_username, "patients") is not None
+
+    # ---------- Letture ----------
+
+    def doctor(self, username, pw_hash):
+        rows = self._query(
+            "SELECT data FROM doctors WHERE (username = ? OR codice_fiscale = ?) AND password_hash = ?",
+            (username, username.upper(), pw_hash)
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    def patient(self, codice_fiscale):
+        rows = self._query("SELECT data FROM patients WHERE codice_fiscale = ?", (codice_fiscale,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def patients(self, doctor_username):
+        rows = self._query("SELECT data FROM patients WHERE doctor_username = ? ORDER BY rowid", (doctor_username,))
+        return [json.loads(r[0]) for r in rows]
+
+    @staticmethod
+    def _range(start, end):
+        """Condizione SQL e parametri per l'intervallo [start, end) sui timestamp ISO"""
+        sql, params = "", []
+        if start:
+            sql += " AND timestamp >= ?"
+            params.append(start.isoformat())
+        if end:
+            sql += " AND timestamp < ?"
+            params.append(end.isoformat())
+        return sql, params
+
+    def measurements(self, codici_fiscali, start=None, end=None, desc=True):
+        """Misurazioni per paziente e data; codici fiscali in blocchi ordinati di MAX_PARAMS"""
+        where, params = self._range(start, end)
+        codici_fiscali = sorted(codici_fiscali)
+        rows = []
+        for i in range(0, len(codici_fiscali), MAX_PARAMS):
+            chunk = codici_fiscali[i:i + MAX_PARAMS]
+            sql = (
+                f"SELECT data FROM measurements WHERE codice_fiscale IN ({', '.join('?' * len(chunk))}){where} "
+                f"ORDER BY codice_fiscale, timestamp {'DESC' if desc else 'ASC'}"
+            )
+            rows.extend(json.loads(r[0]) for r in self._query(sql, [*chunk, *params]))
+        return rows
+
+    def measurements_page(self, codice_fiscale, start=None, limit=None, offset=0):
+        """Pagina delle misurazioni del paziente dalle più recenti e totale nell'intervallo"""
+        where, params = self._range(start, None)
+        rows = self._query(
+            f"SELECT data FROM measurements WHERE codice_fiscale = ?{where} "
+            f"ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            [codice_fiscale, *params, -1 if limit is None else limit, offset]
+        )
+        total = self._query(f"SELECT count(*) FROM measurements WHERE codice_fiscale = ?{where}",
+                            [codice_fiscale, *params])[0][0]
+        return [json.loads(r[0]) for r in rows], total
+
+    def buckets(self, codice_fiscale, bucket, start=None, end=None):
+        """Stesse colonne della funzione measurements_buckets del database"""
+        aggregates = ", ".join(
+            f"avg(json_extract(data, '$.{f}')), min(json_extract(data, '$.{f}')), max(json_extract(data, '$.{f}'))"
+            for f in FEATURES
+        )
+        names = ["timestamp", "n"] + [f"{f}{suffix}" for f in FEATURES for suffix in ("", "_min", "_max")]
+        where, params = self._range(start, end)
+        sql = (
+            f"SELECT {BUCKET_SQL[bucket]} AS periodo, count(*), {aggregates} FROM measurements "
+            f"WHERE codice_fiscale = ?{where} GROUP BY periodo ORDER BY periodo"
+        )
+        return [dict(zip(names, row)) for row in self._query(sql, [codice_fiscale, *params])]
+
+    def open_alerts(self, doctor_username):
+        rows = self._query("SELECT data FROM alerts WHERE doctor_username = ?", (doctor_username,))
+        return sorted((json.loads(r[0]) for r in rows), key=lambda a: a["updated_at"], reverse=True)
+
+    # ---------- Coda delle scritture ----------
+
+    def enqueue(self, kind, payload):
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO outbox (kind, payload, created_at) VALUES (?, ?, ?)",
+                (kind, _dumps(payload), datetime.now().isoformat())
+            )
+            return cursor.lastrowid
+
+    def pending(self):
+        """Operazioni in coda, in ordine: [(id, kind, payload, errore)]"""
+        rows = self._query("SELECT id, kind, payload, error FROM outbox ORDER BY id")
+        return [(i, kind, json.loads(payload), error) for i, kind, payload, error in rows]
+
+    def done(self, entry_id):
+        self._write("DELETE FROM outbox WHERE id = ?", [(entry_id,)])
+        # Misurazione provvisoria della visita (id negativo), sostituita da quella remota al prossimo sync
+        self._write("DELETE FROM measurements WHERE id = ?", [(-entry_id,)])
+
+    def failed(self, entry_id, error):
+        self._write("UPDATE outbox SET error = ? WHERE id = ?", [(error, entry_id)])
+
+    def set_note(self, codice_fiscale, timestamp, note):
+        with self.lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT id, data FROM measurements WHERE codice_fiscale = ? AND timestamp = ?", (codice_fiscale, timestamp)
+            ).fetchall()
+            for measurement_id, data in rows:
+                self.conn.execute("UPDATE measurements SET data = ? WHERE id = ?",
+                                  (_dumps({**json.loads(data), "note_medico": note}), measurement_id))
+
+
+class MirroredBackend:
+    """
+    Backend con letture dalla copia locale e scritture in coda se offline.
+    I metodi non ridefiniti (registrazione, reset password, ...) sono
+    inoltrati al Backend e richiedono la connessione.
+    """
+
+    def __init__(self, backend, path, sync_seconds=SYNC_SECONDS):
+        self.backend = backend
+        self.supabase = backend.supabase
+        self.path = path
+        self.store = LocalStore(path)
+        self.sync_seconds = sync_seconds
+        self.online = True
+        self._synced_at = {}
+        # Medici da sincronizzare periodicamente e subito (thread in background)
+        self._watched = set()
+        self._due = set()
+        self._wake = threading.Event()
+        # Una sola sincronizzazione alla volta: la coda non va inviata due volte
+        self._sync_lock = threading.RLock()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    # ---------- Connessione e sincronizzazione ----------
+
+    def start(self):
+        """Avvia il thread di controllo della connessione e sincronizzazione"""
+        threading.Thread(target=self._run, name="parkinson-mirror", daemon=True).start()
+        return self
+
+    def _run(self):
+        # Connessione SQLite propria del thread: le letture dei rerun non attendono la sincronizzazione
+        store = LocalStore(self.path)
+        while True:
+            self._wake.clear()
+            try:
+                if self.check_connection():
+                    now = time.monotonic()
+                    for doctor_username in list(self._watched):
+                        last = self._synced_at.get(doctor_username)
+                        if doctor_username in self._due or last is None or now - last > self.sync_seconds:
+                            self._due.discard(doctor_username)
+                            self.sync(doctor_username, store)
+            except Exception:
+                logger.exception("Errore nel thread di sincronizzazione")
+            self._wake.wait(CHECK_SECONDS)
+
+    def check_connection(self):
+        """Controllo leggero della connessione (thread in background e invio della coda)"""
+        try:
+            self.supabase.table("doctors").select("id").limit(1).execute()
+            self.online = True
+        except Exception as e:
+            logger.warning("Supabase non raggiungibile: %s", e)
+            self.online = False
+        return self.online
+
+    def connected(self):
+        """Stato della connessione all'ultimo controllo, senza richieste di rete"""
+        return self.online
+
+    def _offline(self, e):
+        logger.warning("Sincronizzazione interrotta: %s", e)
+        self.online = False
+
+    def _lost_connection(self, error):
+        """
+        Scrittura diretta fallita: True se la connessione è caduta dopo l'ultimo
+        controllo (la scrittura va allora in coda), False se l'errore è del database
+        """
+        if self.check_connection():
+            return False
+        self._offline(error)
+        return True
+
+    def watch(self, doctor_username):
+        """Mantiene sincronizzato il medico ogni sync_seconds (da chiamare a ogni rerun, non blocca)"""
+        if doctor_username not in self._watched:
+            self.request_sync(doctor_username)
+
+    def request_sync(self, doctor_username):
+        """Sincronizzazione del medico nel thread in background, appena possibile"""
+        self._watched.add(doctor_username)
+        self._due.add(doctor_username)
+        self._wake.set()
+
+    def sync(self, doctor_username, store=None):
+        """Invia la coda e scarica le modifiche del medico; False se offline"""
+        store = store or self.store
+        self._synced_at[doctor_username] = time.monotonic()
+        try:
+            with self._sync_lock:
+                self._sync(doctor_username, store)
+        except Exception as e:
+            self._offline(e)
+            return False
+        self.online = True
+        return True
+
+    def _sync(self, doctor_username, store):
+        self.flush(store)
+        self._pull(store, doctor_username, "patients", "*", "doctor_username", store.put_patients)
+        self._pull(store, doctor_username, "measurements", "*, patients!inner(doctor_username)",
+                   "patients.doctor_username", store.put_measurements)
+        self._pull(store, doctor_username, "alerts", "*", "doctor_username", store.put_alerts)
+
+    def _pull(self, store, doctor_username, tabella, columns, doctor_column, put):
+        """Righe con updated_at >= watermark, a pagine (le righe al confine sono riscritte, senza effetti)"""
+        watermark = store.watermark(doctor_username, tabella)
+        offset = 0
+        while True:
+            query = self.supabase.table(tabella).select(columns).eq(doctor_column, doctor_username)
+            if watermark:
+                query = query.gte("updated_at", watermark)
+            page = query.order("updated_at").order("id").range(offset, offset + PAGE_SIZE - 1).execute().data
+            for row in page:
+                row.pop("patients", None)
+            put(page)
+            watermark = max([watermark or ""] + [row["updated_at"] for row in page if row.get("updated_at")])
+            if len(page) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        store.set_watermark(doctor_username, tabella, watermark or "")
+
+    def flush(self, store=None):
+        """Invia le operazioni in coda in ordine; si ferma alla prima interrotta dalla connessione"""
+        store = store or self.store
+        with self._sync_lock:
+            for entry_id, kind, payload, error in store.pending():
+                if error is None:
+                    self._replay(store, entry_id, kind, payload)
+
+    def _replay(self, store, entry_id, kind, payload):
+        """Invia un'operazione della coda"""
+        if kind == "visita":
+            _, error = self.backend.save_analyzed_visit(
+                payload["codice_fiscale"],
+                {task: tuple(result) for task, result in payload["per_task"].items()},
+                payload["hashes"],
+                payload["timestamp"],
+                payload.get("key")
+            )
+        else:
+            ok, message = self.backend.add_note(
+                payload["codice_fiscale"], payload["timestamp"], payload["note"], payload["doctor_username"]
+            )
+            error = None if ok else message
+
+        if error is None:
+            store.done(entry_id)
+            return
+        # Backend restituisce gli errori come messaggi: senza connessione si riprova più tardi,
+        # altrimenti l'operazione resta in coda segnata come fallita
+        if not self.check_connection():
+            raise ConnectionError(error)
+        store.failed(entry_id, error)
+
+    def pending_count(self):
+        return len(self.store.pending())
+
+    def failed_writes(self):
+        """Operazioni in coda rifiutate dal database: [(id, kind, payload, errore)]"""
+        return [entry for entry in self.store.pending() if entry[3]]
+
+    def discard(self, entry_id):
+        """Rimuove dalla coda un'operazione rifiutata"""
+        self.store.done(entry_id)
+
+    # ---------- Login (verifica locale senza connessione) ----------
+
+    def login_doctor(self, username, password):
+        if self.connected():
+            doctor = self.backend.login_doctor(username, password)
+            if doctor:
+                self.store.put_doctor(doctor)
+                self.request_sync(doctor["username"])
+            return doctor
+        return self.store.doctor(username, hashlib.sha256(password.encode()).hexdigest())
+
+    def login_patient(self, codice_fiscale, password):
+        if self.connected():
+            return self.backend.login_patient(codice_fiscale, password)
+        patient = self.store.patient(codice_fiscale.upper())
+        if patient and patient.get("password_hash") == hashlib.sha256(password.encode()).hexdigest():
+            return patient
+        return None
+
+    def register_patient(self, codice_fiscale, nome, cognome, password, age, sex, doctor_username):
+        result = self.backend.register_patient(codice_fiscale, nome, cognome, password, age, sex, doctor_username)
+        if result[0]:
+            self.request_sync(doctor_username)
+        return result
+
+    # ---------- Letture locali ----------
+
+    def _local(self, codice_fiscale):
+        """Riga locale del paziente, None se non è nella copia (letture inoltrate a Supabase)"""
+        return self.store.patient(codice_fiscale.upper())
+
+    def get_patients(self, doctor_username):
+        if not self.store.has_doctor_data(doctor_username):
+            return self.backend.get_patients(doctor_username)
+        return self.store.patients(doctor_username)
+
+    def get_history(self, codice_fiscale, start=None, end=None, bucket=None, columns="*"):
+        info = self._local(codice_fiscale)
+        if info is None:
+            return self.backend.get_history(codice_fiscale, start, end, bucket, columns)
+
+        if bucket:
+            return info, self.store.buckets(info["codice_fiscale"], bucket, start, end)
+
+        return info, _select(self.store.measurements([info["codice_fiscale"]], start, end), columns)
+
+    def get_history_page(self, codice_fiscale, start=None, bucket="mese", columns="*", page=0,
+                         page_size=HISTORY_PAGE_SIZE):
+        info = self._local(codice_fiscale)
+        if info is None:
+            return self.backend.get_history_page(codice_fiscale, start, bucket, columns, page, page_size)
+
+        cf = info["codice_fiscale"]
+        rows, total = self.store.measurements_page(cf, start, page_size, page * page_size)
+        return self.store.buckets(cf, bucket, start), _select(rows, columns), total
+
+    def get_patient_stats(self, codice_fiscale):
+        from parkinson.trends import patient_trends
+
+        info = self._local(codice_fiscale)
+        if info is None:
+            return self.backend.get_patient_stats(codice_fiscale)
+
+        trends = patient_trends(self.store.measurements([info["codice_fiscale"]], desc=False))
+        if not trends:
+            return {
+                "n_misurazioni": 0, "ultimo_updrs": None, "primo_updrs": None, "variazione": None,
+                "mediana_mobile": None, "pendenza_mensile": None, "pendenza_theil_sen": None, "trend": None
+            }
+        return trends[0]
+
+    def get_doctor_overview(self, doctor_username):
+        from parkinson.trends import patient_trends
+
+        if not self.store.has_doctor_data(doctor_username):
+            return self.backend.get_doctor_overview(doctor_username)
+
+        patients = self.store.patients(doctor_username)
+        by_cf = {p["codice_fiscale"]: p for p in patients}
+        alerts = [
+            {**a, "patients": {k: by_cf.get(a["codice_fiscale"], {}).get(k) for k in ("nome", "cognome")}}
+            for a in self.store.open_alerts(doctor_username)
+        ]
+        return {
+            "n_pazienti": len(patients),
+            "pazienti_critici": critical_patients(alerts),
+            "andamenti": patient_trends(self.store.measurements(list(by_cf), desc=False)) if by_cf else []
+        }
+
+    # ---------- Scritture ----------
+
+    def add_note(self, codice_fiscale, timestamp, note, doctor_username):
+        cf_upper = codice_fiscale.upper()
+        if self.connected():
+            self.flush_quietly()
+            ok, message = self.backend.add_note(cf_upper, timestamp, note, doctor_username)
+            if ok:
+                self.store.set_note(cf_upper, timestamp, note)
+            if ok or not self._lost_connection(message):
+                return ok, message
+
+        patient = self.store.patient(cf_upper)
+        if not patient or patient["doctor_username"] != doctor_username:
+            return False, "Non autorizzato"
+        self.store.enqueue("nota", {
+            "codice_fiscale": cf_upper, "timestamp": timestamp, "note": note, "doctor_username": doctor_username
+        })
+        self.store.set_note(cf_upper, timestamp, note)
+        return True, "Nota salvata sul dispositivo: sarà inviata al ritorno della connessione"
+
+    def process_visit(self, codice_fiscale, audio_files, token=None):
+        cf_upper = codice_fiscale.upper()
+        patient = self.store.patient(cf_upper)
+        if self.connected() or patient is None:
+            self.flush_quietly()
+            result, error = self.backend.process_visit(cf_upper, audio_files, token)
+            if result and patient is not None:
+                self.request_sync(patient["doctor_username"])
+            if result or patient is None or not self._lost_connection(error):
+                return result, error
+
+        audio_files = visit_files(audio_files)
+        if not audio_files:
+            return None, "Nessuna registrazione caricata"
+        return self.backend.run_visit_once(
+            cf_upper, audio_files, token, lambda key: self._offline_visit(patient, audio_files, key)
+        )
+
+    def flush_quietly(self):
+        """Invia la coda prima di una scrittura diretta, per mantenere l'ordine delle operazioni"""
+        try:
+            self.flush()
+        except Exception as e:
+            self._offline(e)
+
+    def _offline_visit(self, patient, audio_files, key):
+        """Analisi locale, misurazione provvisoria nella copia e visita in coda"""
+        timer = StageTimer()
+        with timer.stage("archivio"):
+            recordings, hashes, duplicati = self.backend.archive_recordings(audio_files)
+        with timer.stage("analisi"):
+            try:
+                estratte = self.backend.extract_vocal_features(recordings, timer)
+            except AudioQualityError as e:
+                return None, f"Registrazione non utilizzabile, da ripetere. {e}"
+        if not estratte:
+            return None, "Errore nell'analisi audio"
+        per_task = {task: (task_feats, compute_updrs(task_feats)) for task, task_feats in estratte.items()}
+
+        # Allerte e anomalie calcolate sui dati locali (le allerte sono salvate all'invio)
+        features, updrs = per_task[primary_task(per_task)]
+        measurement = {"motor_updrs": updrs, **feature_columns(features)}
+        fired = evaluate_rules(
+            self.backend.alert_rules, measurement_metrics(measurement, patient.get("baseline_updrs"))
+        )
+        allerte = [alert_message(name, rule, value) for name, (rule, value) in sorted(fired.items())]
+        anomalie = anomalies(patient.get("feature_stats"), measurement_values(measurement))
+
+        timestamp = datetime.now().isoformat()
+        entry_id = self.store.enqueue("visita", {
+            "codice_fiscale": patient["codice_fiscale"], "timestamp": timestamp,
+            "per_task": per_task, "hashes": hashes, "key": key
+        })
+        self.store.put_measurements([{
+            "id": -entry_id, "codice_fiscale": patient["codice_fiscale"], "timestamp": timestamp,
+            **measurement, "audio_hash": hashes[primary_task(per_task)],
+            "task_features": visit_task_features(per_task, hashes), "note_medico": None, "in_coda": True
+        }])
+
+        result = visit_result(per_task, hashes, duplicati, allerte, anomalie, timer.stages)
+        result["in_coda"] = True
+        return result, None
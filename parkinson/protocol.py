@@ -0,0 +1,22 @@
+"""
+Protocollo della visita: formati accettati e task vocali.
+
+Modulo senza dipendenze (niente numpy o Praat): lo importano le pagine e il
+backend già alla selezione del ruolo.
+"""
+
+# Formati accettati dall'uploader (decodificati da libsndfile)
+SUPPORTED_FORMATS = ["wav", "flac", "ogg", "opus"]
+
+# Task del protocollo vocale, in ordine di priorità: il primo disponibile
+# è il task principale e ne determina feature e UPDRS della misurazione
+VISIT_TASKS = {
+    "vocale": "Vocale sostenuta /a/",
+    "ddk": "Diadococinesi (pa-ta-ka)",
+    "lettura": "Lettura di un brano"
+}
+
+
+def primary_task(tasks):
+    """Task principale della visita tra quelli registrati"""
+    return next(task for task in VISIT_TASKS if task in tasks)
@@ -0,0 +1,227 @@
+"""
+Rianalisi delle registrazioni archiviate.
+
+Ricalcola feature e UPDRS delle misurazioni con audio in archivio la cui
+versione di estrazione non è quella corrente, ad esempio dopo una modifica
+all'estrazione delle feature o alla calibrazione di compute_updrs.
+
+Uso:
+    SUPABASE_URL=... SUPABASE_KEY=... python -m parkinson.reanalysis \\
+        [--archivio DIR] [--workers N] [--batch N]
+
+Il job procede in due fasi:
+1. ogni registrazione (task principale e secondari) delle misurazioni obsolete
+   viene analizzata in un pool di processi e il risultato salvato a blocchi
+   nella tabella feature_memo per la versione corrente;
+2. le misurazioni vengono riscritte in blocco a partire dai risultati in memo.
+Il job è riprendibile: la tabella feature_memo fa da checkpoint, al riavvio le
+registrazioni già presenti per la versione corrente non vengono rianalizzate.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from parkinson.archive import find_recording
+from parkinson.audio import ANALYSIS_SAMPLE_RATE
+from parkinson.features import (
+    compute_updrs, extract_features, extraction_version, feature_columns, primary_task
+)
+from parkinson.memo import get_memo, put_memo
+
+PAGE_SIZE = 1000
+
+
+# ==================== LETTURA / SCRITTURA DATABASE ====================
+
+def fetch_stale_measurements(supabase, version, page_size=PAGE_SIZE):
+    """
+    Misurazioni con audio archiviato e versione di estrazione diversa da
+    quella corrente.
+    Paginazione per id (keyset) per non caricare la tabella in una sola richiesta.
+    """
+    measurements = []
+    last_id = 0
+    while True:
+        response = supabase.table("measurements").select(
+            "id, codice_fiscale, timestamp, audio_hash, task_features"
+        ).not_.is_("audio_hash", "null").or_(
+            f"extraction_version.is.null,extraction_version.neq.{version}"
+        ).gt("id", last_id).order("id").limit(page_size).execute()
+
+        measurements.extend(response.data)
+
+        if len(response.data) < page_size:
+            return measurements
+        last_id = response.data[-1]["id"]
+
+
+def write_rows(supabase, rows, page_size=PAGE_SIZE):
+    """Scrittura in blocco: un upsert ogni page_size righe"""
+    for i in range(0, len(rows), page_size):
+        supabase.table("measurements").upsert(rows[i:i + page_size]).execute()
+
+
+def recording_hashes(measurement):
+    """Hash di tutte le registrazioni della misurazione (task principale e secondari)"""
+    return set(recording_tasks(measurement))
+
+
+def recording_tasks(measurement):
+    """Task di ogni registrazione della misurazione, per hash (vocale senza dettaglio per task)"""
+    tasks = {measurement["audio_hash"]: "vocale"}
+    for task, task_feats in (measurement.get("task_features") or {}).items():
+        if task_feats.get("audio_hash"):
+            tasks[task_feats["audio_hash"]] = task
+    return tasks
+
+
+def rebuild_row(measurement, results, version):
+    """Riga aggiornata della misurazione a partire dai risultati per hash"""
+    task_features = None
+    if measurement.get("task_features"):
+        task_features = {}
+        for task, old in measurement["task_features"].items():
+            features, updrs = results[old["audio_hash"]]
+            task_features[task] = {**features, "motor_updrs": updrs, "audio_hash": old["audio_hash"]}
+        features, updrs = results[task_features[primary_task(task_features)]["audio_hash"]]
+    else:
+        features, updrs = results[measurement["audio_hash"]]
+
+    return {
+        "id": measurement["id"],
+        "codice_fiscale": measurement["codice_fiscale"],
+        "timestamp": measurement["timestamp"],
+        "motor_updrs": updrs,
+        **feature_columns(features),
+        "extraction_version": version,
+        "task_features": task_features
+    }
+
+
+# ==================== ANALISI (PROCESSI WORKER) ====================
+
+def analyze_recording(digest, path, sampling_frequency, task="vocale"):
+    """Eseguita nei processi worker: restituisce (hash, feature, updrs, errore)"""
+    try:
+        features = extract_features(path, sampling_frequency, task=task)
+        return digest, features, compute_updrs(features), None
+    except Exception as e:
+        return digest, None, None, str(e)
+
+
+class Progress:
+    """Throughput ed ETA del job"""
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.errors = 0
+        self.start = time.perf_counter()
+
+    def update(self, n_done, n_errors=0):
+        self.done += n_done
+        self.errors += n_errors
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        eta = remaining / rate if rate > 0 else float("inf")
+        eta_str = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta != float("inf") else "--:--:--"
+        print(
+            f"[{self.done}/{self.total}] {rate:.2f} registrazioni/s - "
+            f"errori: {self.errors} - ETA: {eta_str}",
+            flush=True
+        )
+
+
+# ==================== JOB ====================
+
+def run(supabase, archive_dir, workers=None, batch_size=50,
+        sampling_frequency=ANALYSIS_SAMPLE_RATE):
+    """Rianalizza le misurazioni con versione di estrazione obsoleta"""
+    version = extraction_version(sampling_frequency)
+    measurements = fetch_stale_measurements(supabase, version)
+    recording_task = {}
+    for m in measurements:
+        recording_task.update(recording_tasks(m))
+    needed = set(recording_task)
+
+    # Risultati già calcolati con questa versione (anche da esecuzioni interrotte)
+    results = get_memo(supabase, needed, version)
+
+    tasks = []
+    missing = 0
+    for digest in needed - results.keys():
+        path = find_recording(archive_dir, digest)
+        if path is None:
+            missing += 1
+            continue
+        tasks.append((digest, str(path)))
+
+    print(f"Versione di estrazione: {version}")
+    print(f"Misurazioni obsolete: {len(measurements)} - registrazioni: {len(needed)} "
+          f"- già in memo: {len(results)} - da analizzare: {len(tasks)} - file mancanti: {missing}")
+
+    # Fase 1: analisi parallela, risultati salvati in memo a blocchi
+    progress = Progress(len(tasks))
+    batch, batch_errors = {}, 0
+
+    def flush():
+        nonlocal batch, batch_errors
+        put_memo(supabase, batch, version)
+        results.update(batch)
+        progress.update(len(batch), batch_errors)
+        progress.report()
+        batch, batch_errors = {}, 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(analyze_recording, digest, path, sampling_frequency, recording_task[digest])
+            for digest, path in tasks
+        ]
+        for future in as_completed(futures):
+            digest, features, updrs, error = future.result()
+            if error:
+                # Non salvata in memo: verrà ritentata al prossimo avvio
+                print(f"Errore {digest[:12]}: {error}")
+                batch_errors += 1
+            else:
+                batch[digest] = (features, updrs)
+
+            if len(batch) >= batch_size:
+                flush()
+
+    if batch or batch_errors:
+        flush()
+
+    # Fase 2: riscrittura in blocco delle misurazioni con tutti i risultati disponibili
+    # (una registrazione può essere collegata a più misurazioni: upload ripetuti)
+    rows = [
+        rebuild_row(m, results, version)
+        for m in measurements
+        if recording_hashes(m) <= results.keys()
+    ]
+    write_rows(supabase, rows)
+    print(f"Misurazioni aggiornate: {len(rows)} - rimaste obsolete: {len(measurements) - len(rows)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archivio", default=os.environ.get("AUDIO_ARCHIVE_DIR", "audio_archive"))
+    parser.add_argument("--workers", type=int, default=None, help="Processi worker (default: numero di CPU)")
+    parser.add_argument("--batch", type=int, default=50, help="Risultati per scrittura in blocco nel memo")
+    parser.add_argument("--sample-rate", type=int, default=ANALYSIS_SAMPLE_RATE)
+    args = parser.parse_args()
+
+    from supabase import create_client
+
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    run(supabase, Path(args.archivio), args.workers, args.batch, args.sample_rate)
+
+
+if __name__ == "__main__":
+    main()
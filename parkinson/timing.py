@@ -0,0 +1,129 @@
+"""Tempi e memoria per stadio della pipeline di analisi, log strutturati e metriche Prometheus"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger("parkinson.timing")
+
+
+def rss_bytes():
+    """Memoria residente attuale del processo (0 se non disponibile)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def peak_rss_bytes():
+    """Picco di memoria residente del processo (0 se non disponibile)"""
+    if resource is None:
+        return 0
+    # ru_maxrss è in KB su Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StageTimer:
+    """Raccoglie durata, variazione di memoria e picco per ogni stadio"""
+
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append({
+                "stage": name,
+                "seconds": time.perf_counter() - start,
+                "rss_delta_bytes": rss_bytes() - rss_before,
+                "peak_rss_bytes": peak_rss_bytes()
+            })
+
+    def extend(self, stages, prefix=""):
+        """Aggiunge stadi misurati altrove (es. in un processo worker)"""
+        self.stages.extend({**s, "stage": f"{prefix}{s['stage']}"} for s in stages)
+
+
+class NullTimer:
+    """Timer che non misura nulla: usato quando la strumentazione non è richiesta"""
+    stages = ()
+
+    def stage(self, name):
+        return nullcontext()
+
+    def extend(self, stages, prefix=""):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+# ==================== LOG E METRICHE ====================
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def log_stages(event, stages, **fields):
+    """Una riga di log JSON con tutti gli stadi"""
+    logger.info(json.dumps({"event": event, **fields, "stages": stages}, default=str))
+
+
+def record_metrics(stages, path=None):
+    """
+    Accumula gli stadi nel registro del processo e, se indicato, riscrive
+    il file di metriche in formato testo Prometheus (scrittura atomica).
+    """
+    with _metrics_lock:
+        for s in stages:
+            entry = _metrics.setdefault(s["stage"], {"count": 0, "seconds": 0.0, "last": 0.0, "peak": 0})
+            entry["count"] += 1
+            entry["seconds"] += s["seconds"]
+            entry["last"] = s["seconds"]
+            entry["peak"] = max(entry["peak"], s.get("peak_rss_bytes", 0))
+        if path:
+            _write_prometheus(path, _metrics)
+
+
+def _write_prometheus(path, metrics):
+    lines = [
+        "# HELP parkinson_stage_seconds_total Tempo cumulato per stadio della pipeline",
+        "# TYPE parkinson_stage_seconds_total counter",
+    ]
+    lines += [f'parkinson_stage_seconds_total{{stage="{k}"}} {v["seconds"]:.6f}' for k, v in sorted(metrics.items())]
+    lines += [
+        "# HELP parkinson_stage_calls_total Esecuzioni per stadio della pipeline",
+        "# TYPE parkinson_stage_calls_total counter",
+    ]
+    lines += [f'parkinson_stage_calls_total{{stage="{k}"}} {v["count"]}' for k, v in sorted(metrics.items())]
+    lines += [
+        "# HELP parkinson_stage_last_seconds Durata dell'ultima esecuzione per stadio",
+        "# TYPE parkinson_stage_last_seconds gauge",
+    ]
+    lines += [f'parkinson_stage_last_seconds{{stage="{k}"}} {v["last"]:.6f}' for k, v in sorted(metrics.items())]
+    lines += [
+        "# HELP parkinson_stage_peak_rss_bytes Picco di memoria residente osservato per stadio",
+        "# TYPE parkinson_stage_peak_rss_bytes gauge",
+    ]
+    lines += [f'parkinson_stage_peak_rss_bytes{{stage="{k}"}} {v["peak"]}' for k, v in sorted(metrics.items())]
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
@@ -0,0 +1,165 @@
+"""
+Tracciamento delle chiamate al database.
+
+TracedClient avvolge il client Supabase: ogni operazione su tabella (o rpc)
+eseguita con .execute() viene registrata nella traccia corrente con funzione
+chiamante, tabella, operazione, latenza, righe e, se richiesta, dimensione
+della risposta (serializzazione JSON: costosa sulle pagine grandi, quindi
+misurata solo con measure_bytes, es. con il pannello DEBUG_DB attivo).
+La traccia corrente è per contesto (un rerun Streamlit = una traccia).
+"""
+
+import contextvars
+import json
+import logging
+import sys
+import time
+
+logger = logging.getLogger("parkinson.tracing")
+
+OPERATIONS = {"select", "insert", "update", "upsert", "delete"}
+
+_current = contextvars.ContextVar("db_trace", default=None)
+
+
+class CallTrace:
+    """Chiamate al database di un rerun"""
+
+    def __init__(self):
+        self.calls = []
+        self.start = time.perf_counter()
+
+    def record(self, function, table, operation, seconds, rows, response_bytes, error=None):
+        self.calls.append({
+            "function": function,
+            "table": table,
+            "operation": operation,
+            "seconds": seconds,
+            "rows": rows,
+            "bytes": response_bytes,
+            "error": error
+        })
+
+    def summary(self):
+        """Aggregato per funzione chiamante, ordinato per tempo totale"""
+        by_function = {}
+        for call in self.calls:
+            entry = by_function.setdefault(call["function"], {
+                "function": call["function"], "calls": 0, "seconds": 0.0,
+                "rows": 0, "bytes": 0, "errors": 0, "tables": set()
+            })
+            entry["calls"] += 1
+            entry["seconds"] += call["seconds"]
+            entry["rows"] += call["rows"]
+            entry["bytes"] += call["bytes"]
+            entry["errors"] += call["error"] is not None
+            entry["tables"].add(call["table"])
+        return sorted(
+            ({**e, "tables": sorted(e["tables"])} for e in by_function.values()),
+            key=lambda e: e["seconds"], reverse=True
+        )
+
+    def totals(self):
+        return {
+            "calls": len(self.calls),
+            "seconds": sum(c["seconds"] for c in self.calls),
+            "rows": sum(c["rows"] for c in self.calls),
+            "bytes": sum(c["bytes"] for c in self.calls)
+        }
+
+    def as_stages(self):
+        """Chiamate nel formato degli stadi di parkinson.timing (per record_metrics)"""
+        return [{"stage": f"db/{c['function']}", "seconds": c["seconds"]} for c in self.calls]
+
+
+def start_trace():
+    """Nuova traccia per il contesto corrente (da chiamare all'inizio di ogni rerun)"""
+    trace = CallTrace()
+    _current.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current.get()
+
+
+def log_trace(trace, event="rerun", **fields):
+    """Una riga di log JSON con totali e aggregato per funzione"""
+    logger.info(json.dumps({
+        "event": event, **fields, **trace.totals(), "functions": trace.summary()
+    }, default=str))
+
+
+def _response_size(data):
+    """Dimensione stimata della risposta (JSON serializzato)"""
+    if data is None:
+        return 0
+    return len(json.dumps(data, default=str).encode())
+
+
+class _TracedQuery:
+    """Proxy di un query builder: inoltra la catena e misura execute()"""
+
+    def __init__(self, builder, table, operation=None, measure_bytes=False):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+        self._measure_bytes = measure_bytes
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if name == "execute":
+            return self._execute
+        if not callable(attr):
+            # Proprietà che restituiscono un builder (es. .not_)
+            return _TracedQuery(attr, self._table, self._operation, self._measure_bytes)
+
+        operation = self._operation or (name if name in OPERATIONS else None)
+
+        def chained(*args, **kwargs):
+            return _TracedQuery(attr(*args, **kwargs), self._table, operation, self._measure_bytes)
+        return chained
+
+    def _execute(self):
+        function = sys._getframe(1).f_code.co_name
+        trace = _current.get()
+        start = time.perf_counter()
+        try:
+            response = self._builder.execute()
+        except Exception as e:
+            if trace is not None:
+                trace.record(function, self._table, self._operation,
+                             time.perf_counter() - start, 0, 0, error=str(e))
+            raise
+        if trace is not None:
+            data = getattr(response, "data", None)
+            trace.record(
+                function, self._table, self._operation, time.perf_counter() - start,
+                len(data) if isinstance(data, list) else int(data is not None),
+                _response_size(data) if self._measure_bytes else 0
+            )
+        return response
+
+
+class TracedClient:
+    """
+    Client Supabase con tracciamento di table() e rpc(); il resto è inoltrato.
+    get_client è una funzione senza argomenti che restituisce il client reale,
+    chiamata alla prima operazione (creazione e import di supabase differiti).
+    measure_bytes: misura la dimensione delle risposte (altrimenti 0).
+    """
+
+    def __init__(self, get_client, measure_bytes=False):
+        self._get_client = get_client
+        self._measure_bytes = measure_bytes
+
+    def table(self, name):
+        return _TracedQuery(self._get_client().table(name), name, measure_bytes=self._measure_bytes)
+
+    def rpc(self, fn, params=None, **kwargs):
+        return _TracedQuery(
+            self._get_client().rpc(fn, params or {}, **kwargs), f"rpc:{fn}", "rpc", self._measure_bytes
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._get_client(), name)
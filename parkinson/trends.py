@@ -0,0 +1,143 @@
+"""
+Andamento dell'UPDRS motorio per paziente.
+
+La differenza ultimo - primo UPDRS dipende da due sole misurazioni e cambia
+segno per un singolo valore anomalo. Qui l'andamento è la pendenza in punti
+UPDRS al mese, stimata con minimi quadrati e con Theil-Sen (mediana delle
+pendenze tra tutte le coppie di misurazioni, robusta agli outlier), insieme
+alla mediana mobile sulle ultime visite.
+
+Visite ripetute nello stesso giorno non danno pendenze: una differenza di
+pochi punti su qualche minuto diventerebbe di migliaia di punti al mese. Le
+coppie più vicine di MIN_PAIR_DAYS sono escluse e, se lo storico copre meno di
+MIN_SPAN_DAYS, pendenze e andamento non sono stimati (None).
+
+Tutti i pazienti sono stimati in un solo passaggio vettoriale (groupby e
+array NumPy, nessun ciclo Python per paziente) su un'unica lettura delle sole
+colonne codice_fiscale, timestamp e motor_updrs.
+"""
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["codice_fiscale", "timestamp", "motor_updrs"]
+
+DAYS_PER_MONTH = 30.4375
+ROLLING_WINDOW = 3   # Visite nella mediana mobile
+STABLE_SLOPE = 0.5   # Pendenza Theil-Sen (UPDRS/mese) sotto cui l'andamento è "stabile"
+MIN_PAIR_DAYS = 1    # Distanza minima tra due misurazioni per una pendenza Theil-Sen
+MIN_SPAN_DAYS = 14   # Durata minima dello storico per stimare l'andamento
+
+
+def measurements_frame(rows):
+    """Misurazioni ordinate per paziente e data, con il tempo in mesi (colonna mesi)"""
+    df = pd.DataFrame(rows, columns=COLUMNS).dropna(subset=["motor_updrs"])
+    timestamps = pd.to_datetime(df["timestamp"], format="ISO8601", utc=True)
+    df = df.assign(
+        motor_updrs=df["motor_updrs"].astype(float),
+        mesi=(timestamps - timestamps.min()).dt.total_seconds() / 86400 / DAYS_PER_MONTH
+    )
+    return df.sort_values(["codice_fiscale", "mesi"], ignore_index=True)
+
+
+def _pairs(sizes):
+    """Indici (i, j), i < j, di tutte le coppie di righe nello stesso gruppo (gruppi contigui)"""
+    starts = np.repeat(np.cumsum(sizes) - sizes, sizes)
+    ends = starts + np.repeat(sizes, sizes)
+    rows = np.arange(len(starts))
+    counts = ends - rows - 1
+    i = np.repeat(rows, counts)
+    j = i + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return i, j
+
+
+def theil_sen_slopes(df):
+    """
+    Pendenza Theil-Sen per paziente (df da measurements_frame).
+    Le coppie sono n*(n-1)/2 per paziente: poche migliaia con uno storico di
+    qualche decina di visite.
+    """
+    codes, patients = pd.factorize(df["codice_fiscale"])
+    i, j = _pairs(np.bincount(codes, minlength=len(patients)))
+    x, y = df["mesi"].to_numpy(), df["motor_updrs"].to_numpy()
+
+    dx = x[j] - x[i]
+    valid = dx >= MIN_PAIR_DAYS / DAYS_PER_MONTH   # Visite ripetute nello stesso giorno escluse
+    slopes = pd.Series((y[j] - y[i])[valid] / dx[valid])
+    return slopes.groupby(patients[codes[i][valid]]).median()
+
+
+def least_squares_slopes(df):
+    """Pendenza ai minimi quadrati per paziente (df da measurements_frame)"""
+    grouped = df.groupby("codice_fiscale")
+    dx = df["mesi"] - grouped["mesi"].transform("mean")
+    dy = df["motor_updrs"] - grouped["motor_updrs"].transform("mean")
+    sxy = (dx * dy).groupby(df["codice_fiscale"]).sum()
+    sxx = (dx * dx).groupby(df["codice_fiscale"]).sum()
+    return sxy / sxx.where(sxx > 0)
+
+
+def rolling_median(df, window=ROLLING_WINDOW):
+    """Mediana mobile dell'UPDRS sulle ultime `window` visite di ciascun paziente"""
+    return df.groupby("codice_fiscale")["motor_updrs"].rolling(window, min_periods=1).median().droplevel(0)
+
+
+def patient_trends(rows):
+    """
+    Andamento di ogni paziente presente in rows (dict con codice_fiscale,
+    timestamp, motor_updrs). Una lista di dict, in ordine di pendenza
+    Theil-Sen decrescente (i peggioramenti più rapidi per primi):
+    codice_fiscale, n_misurazioni, primo_updrs, ultimo_updrs, variazione,
+    mediana_mobile, pendenza_mensile (minimi quadrati), pendenza_theil_sen,
+    trend ("peggioramento", "miglioramento", "stabile"). Pendenze e trend sono
+    None se le misurazioni coprono meno di MIN_SPAN_DAYS giorni.
+    """
+    df = measurements_frame(rows)
+    if df.empty:
+        return []
+
+    grouped = df.assign(mediana_mobile=rolling_median(df)).groupby("codice_fiscale")
+    trends = pd.DataFrame({
+        "n_misurazioni": grouped.size(),
+        "primo_updrs": grouped["motor_updrs"].first(),
+        "ultimo_updrs": grouped["motor_updrs"].last(),
+        "mediana_mobile": grouped["mediana_mobile"].last(),
+        "pendenza_mensile": least_squares_slopes(df),
+        "pendenza_theil_sen": theil_sen_slopes(df)
+    })
+    trends["variazione"] = trends["ultimo_updrs"] - trends["primo_updrs"]
+
+    # Storico troppo breve (es. solo visite ripetute nello stesso giorno): nessuna pendenza
+    span = grouped["mesi"].max() - grouped["mesi"].min()
+    too_short = span < MIN_SPAN_DAYS / DAYS_PER_MONTH
+    trends.loc[too_short, ["pendenza_mensile", "pendenza_theil_sen"]] = np.nan
+
+    slope = trends["pendenza_theil_sen"]
+    trends["trend"] = np.select(
+        [slope > STABLE_SLOPE, slope < -STABLE_SLOPE, slope.notna()],
+        ["peggioramento", "miglioramento", "stabile"],
+        default=None
+    )
+
+    trends = trends.sort_values("pendenza_theil_sen", ascending=False, na_position="last")
+    trends = trends.rename_axis("codice_fiscale").reset_index()
+    return trends.astype(object).where(trends.notna(), None).to_dict("records")
+
+
+def fetch_doctor_measurements(supabase, doctor_username, page_size=1000):
+    """
+    UPDRS di tutti i pazienti del medico con una sola query (join interno su
+    patients), a pagine perché PostgREST limita le righe per risposta.
+    """
+    rows = []
+    offset = 0
+    while True:
+        page = supabase.table("measurements").select(
+            f"{', '.join(COLUMNS)}, patients!inner(doctor_username)"
+        ).eq("patients.doctor_username", doctor_username).order("codice_fiscale").order(
+            "timestamp"
+        ).order("id").range(offset, offset + page_size - 1).execute().data
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        offset += page_size
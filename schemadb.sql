@@ -1,4 +1,22 @@
 
+CREATE TABLE public.alerts (
+  id integer NOT NULL DEFAULT nextval('alerts_id_seq'::regclass),
+  codice_fiscale character varying NOT NULL,
+  doctor_username character varying NOT NULL,
+  measurement_id integer,
+  rule character varying NOT NULL,
+  message text,
+  value double precision,
+  threshold double precision,
+  motor_updrs numeric,
+  variazione numeric,
+  created_at timestamp without time zone DEFAULT now(),
+  updated_at timestamp without time zone DEFAULT now(),
+  resolved_at timestamp without time zone,
+  CONSTRAINT alerts_pkey PRIMARY KEY (id),
+  CONSTRAINT alerts_codice_fiscale_fkey FOREIGN KEY (codice_fiscale) REFERENCES public.patients(codice_fiscale),
+  CONSTRAINT alerts_measurement_id_fkey FOREIGN KEY (measurement_id) REFERENCES public.measurements(id)
+);
 CREATE TABLE public.doctors (
   id integer NOT NULL DEFAULT nextval('doctors_id_seq'::regclass),
   username character varying NOT NULL UNIQUE,
@@ -7,6 +25,14 @@ CREATE TABLE public.doctors (
   created_at timestamp without time zone DEFAULT now(),
   CONSTRAINT doctors_pkey PRIMARY KEY (id)
 );
+CREATE TABLE public.feature_memo (
+  audio_hash character(64) NOT NULL,
+  extraction_version character varying NOT NULL,
+  features jsonb NOT NULL,
+  motor_updrs numeric,
+  created_at timestamp without time zone DEFAULT now(),
+  CONSTRAINT feature_memo_pkey PRIMARY KEY (audio_hash, extraction_version)
+);
 CREATE TABLE public.measurements (
   id integer NOT NULL DEFAULT nextval('measurements_id_seq'::regclass),
   codice_fiscale character varying NOT NULL,
@@ -20,6 +46,14 @@ CREATE TABLE public.measurements (
   dfa double precision,
   ppe double precision,
   note_medico text,
+  audio_hash character(64),
+  extraction_version character varying,
+  task_features jsonb,
+  rpde double precision,
+  spectral_tilt double precision,
+  mfcc double precision[],
+  updated_at timestamp without time zone DEFAULT now(),
+  idempotency_key character(64),
   CONSTRAINT measurements_pkey PRIMARY KEY (id),
   CONSTRAINT measurements_codice_fiscale_fkey FOREIGN KEY (codice_fiscale) REFERENCES public.patients(codice_fiscale)
 );
@@ -35,6 +69,96 @@ CREATE TABLE public.patients (
   baseline_date timestamp without time zone,
   doctor_username character varying NOT NULL,
   created_at timestamp without time zone DEFAULT now(),
+  feature_stats jsonb,
+  updated_at timestamp without time zone DEFAULT now(),
   CONSTRAINT patients_pkey PRIMARY KEY (id),
   CONSTRAINT patients_doctor_username_fkey FOREIGN KEY (doctor_username) REFERENCES public.doctors(username)
 );
+CREATE UNIQUE INDEX alerts_codice_fiscale_rule_open_idx ON public.alerts USING btree (codice_fiscale, rule) WHERE resolved_at IS NULL;
+CREATE INDEX alerts_doctor_username_open_idx ON public.alerts USING btree (doctor_username, updated_at) WHERE resolved_at IS NULL;
+CREATE INDEX measurements_audio_hash_idx ON public.measurements USING btree (audio_hash);
+CREATE INDEX measurements_extraction_version_idx ON public.measurements USING btree (extraction_version);
+CREATE UNIQUE INDEX measurements_idempotency_key_idx ON public.measurements USING btree (idempotency_key);
+CREATE INDEX measurements_codice_fiscale_timestamp_idx ON public.measurements USING btree (codice_fiscale, "timestamp");
+CREATE INDEX measurements_updated_at_idx ON public.measurements USING btree (updated_at);
+CREATE INDEX patients_created_at_idx ON public.patients USING btree (created_at);
+CREATE INDEX patients_doctor_username_id_idx ON public.patients USING btree (doctor_username, id);
+CREATE INDEX patients_doctor_username_updated_at_idx ON public.patients USING btree (doctor_username, updated_at);
+CREATE FUNCTION public.measurements_buckets(
+  p_codice_fiscale character varying,
+  p_bucket text,
+  p_from timestamp without time zone DEFAULT NULL,
+  p_to timestamp without time zone DEFAULT NULL
+) RETURNS TABLE (
+  "timestamp" timestamp without time zone,
+  n bigint,
+  motor_updrs double precision, motor_updrs_min double precision, motor_updrs_max double precision,
+  jitter double precision, jitter_min double precision, jitter_max double precision,
+  shimmer double precision, shimmer_min double precision, shimmer_max double precision,
+  hnr double precision, hnr_min double precision, hnr_max double precision,
+  nhr double precision, nhr_min double precision, nhr_max double precision,
+  dfa double precision, dfa_min double precision, dfa_max double precision,
+  ppe double precision, ppe_min double precision, ppe_max double precision,
+  rpde double precision, rpde_min double precision, rpde_max double precision,
+  spectral_tilt double precision, spectral_tilt_min double precision, spectral_tilt_max double precision
+) LANGUAGE sql STABLE AS $$
+  SELECT
+    date_trunc(p_bucket, m."timestamp"),
+    count(*),
+    avg(m.motor_updrs)::double precision, min(m.motor_updrs)::double precision, max(m.motor_updrs)::double precision,
+    avg(m.jitter)::double precision, min(m.jitter)::double precision, max(m.jitter)::double precision,
+    avg(m.shimmer)::double precision, min(m.shimmer)::double precision, max(m.shimmer)::double precision,
+    avg(m.hnr)::double precision, min(m.hnr)::double precision, max(m.hnr)::double precision,
+    avg(m.nhr)::double precision, min(m.nhr)::double precision, max(m.nhr)::double precision,
+    avg(m.dfa)::double precision, min(m.dfa)::double precision, max(m.dfa)::double precision,
+    avg(m.ppe)::double precision, min(m.ppe)::double precision, max(m.ppe)::double precision,
+    avg(m.rpde)::double precision, min(m.rpde)::double precision, max(m.rpde)::double precision,
+    avg(m.spectral_tilt)::double precision, min(m.spectral_tilt)::double precision, max(m.spectral_tilt)::double precision
+  FROM public.measurements m
+  WHERE m.codice_fiscale = p_codice_fiscale
+    AND (p_from IS NULL OR m."timestamp" >= p_from)
+    AND (p_to IS NULL OR m."timestamp" < p_to)
+  GROUP BY 1
+  ORDER BY 1
+$$;
+CREATE FUNCTION public.add_feature_sample(
+  p_codice_fiscale character varying,
+  p_values jsonb,
+  p_baseline_updrs numeric DEFAULT NULL
+) RETURNS jsonb LANGUAGE sql AS $$
+  UPDATE public.patients p
+  SET feature_stats = COALESCE(p.feature_stats, '{}'::jsonb) || (
+        SELECT COALESCE(jsonb_object_agg(v.key, jsonb_build_object(
+          'n', s.n + 1,
+          'mean', s.mean + (v.x - s.mean) / (s.n + 1),
+          'm2', s.m2 + (v.x - s.mean) * (v.x - s.mean - (v.x - s.mean) / (s.n + 1))
+        )), '{}'::jsonb)
+        FROM (SELECT key, value::double precision AS x FROM jsonb_each_text(p_values)) v
+        CROSS JOIN LATERAL (
+          SELECT
+            COALESCE((p.feature_stats -> v.key ->> 'n')::integer, 0) AS n,
+            COALESCE((p.feature_stats -> v.key ->> 'mean')::double precision, 0) AS mean,
+            COALESCE((p.feature_stats -> v.key ->> 'm2')::double precision, 0) AS m2
+        ) s
+      ),
+      baseline_updrs = COALESCE(p.baseline_updrs, p_baseline_updrs)
+  WHERE p.codice_fiscale = p_codice_fiscale
+  RETURNING p.feature_stats
+$$;
+CREATE FUNCTION public.reset_patient_passwords(p_passwords jsonb)
+RETURNS SETOF character varying LANGUAGE sql AS $$
+  UPDATE public.patients p
+  SET password_hash = r.password_hash
+  FROM jsonb_to_recordset(p_passwords) AS r(codice_fiscale character varying, password_hash character varying)
+  WHERE p.codice_fiscale = r.codice_fiscale
+  RETURNING p.codice_fiscale
+$$;
+CREATE FUNCTION public.set_updated_at() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  NEW.updated_at = now();
+  RETURN NEW;
+END
+$$;
+CREATE TRIGGER alerts_set_updated_at BEFORE UPDATE ON public.alerts FOR EACH ROW EXECUTE FUNCTION public.set_updated_at();
+CREATE TRIGGER measurements_set_updated_at BEFORE UPDATE ON public.measurements FOR EACH ROW EXECUTE FUNCTION public.set_updated_at();
+CREATE TRIGGER patients_set_updated_at BEFORE UPDATE ON public.patients FOR EACH ROW EXECUTE FUNCTION public.set_updated_at();
@@ -0,0 +1,29 @@
+"""Test del package parkinson: la radice del repository nel path di import e registrazioni sintetiche"""
+
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def synthetic_vowel(dur=2.0, fs=16000, f0=130, amp=0.2, seed=0):
+    """Vocale sostenuta sintetica: armoniche di f0 con un po' di jitter"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    f = f0 + rng.normal(0, 0.5, int(dur * fs))
+    phase = 2 * np.pi * np.cumsum(f) / fs
+    return amp * sum(np.sin(k * phase) / k ** 1.2 for k in range(1, 20))
+
+
+@pytest.fixture(scope="session")
+def wav_bytes():
+    """Vocale sostenuta sintetica di 2 s in WAV PCM_16 a 16 kHz"""
+    import soundfile as sf
+
+    buf = io.BytesIO()
+    sf.write(buf, synthetic_vowel(), 16000, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
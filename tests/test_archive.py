@@ -0,0 +1,62 @@
+"""Archivio delle registrazioni indirizzato per contenuto (parkinson.archive)"""
+
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from parkinson.archive import archive_stats, audio_hash, find_recording, shard_dir, store_recording
+
+
+def wav(subtype, n=1600, fs=8000):
+    buf = io.BytesIO()
+    sf.write(buf, 0.5 * np.sin(np.arange(n) / 10), fs, format="WAV", subtype=subtype)
+    return buf.getvalue()
+
+
+def test_recording_stored_once_under_its_hash(tmp_path):
+    data = wav("PCM_16")
+    digest, nuova = store_recording(tmp_path, data, "vocale.wav")
+    assert nuova and digest == audio_hash(data)
+    assert find_recording(tmp_path, digest).parent == shard_dir(tmp_path, digest)
+
+    assert store_recording(tmp_path, data, "copia.wav") == (digest, False)
+    assert archive_stats(tmp_path)["n_registrazioni"] == 1
+    assert not list(tmp_path.glob("*/*/*.tmp"))
+
+
+@pytest.mark.parametrize("subtype, flac_subtype", [("PCM_16", "PCM_16"), ("PCM_24", "PCM_24"), ("PCM_U8", "PCM_16")])
+def test_integer_wav_compressed_to_lossless_flac(tmp_path, subtype, flac_subtype):
+    data = wav(subtype)
+    digest, _ = store_recording(tmp_path, data, "vocale.wav")
+    path = find_recording(tmp_path, digest)
+
+    assert path.suffix == ".flac"
+    assert sf.info(str(path)).subtype == flac_subtype
+    # Stessi campioni dell'originale (l'8 bit senza segno è solo allargato)
+    original, _ = sf.read(io.BytesIO(data), dtype="float64")
+    archived, _ = sf.read(str(path), dtype="float64")
+    np.testing.assert_array_equal(archived, original)
+
+
+def test_float_wav_stored_unchanged(tmp_path):
+    data = wav("FLOAT")
+    digest, _ = store_recording(tmp_path, data, "vocale.wav")
+    path = find_recording(tmp_path, digest)
+    assert path.suffix == ".wav" and path.read_bytes() == data
+
+
+def test_unreadable_wav_falls_back_to_original_bytes(tmp_path):
+    data = b"RIFF\x00\x00\x00\x00WAVEnon audio"
+    digest, nuova = store_recording(tmp_path, data, "rotto.wav")
+    assert nuova
+    assert find_recording(tmp_path, digest).read_bytes() == data
+
+
+def test_compressed_formats_kept_as_uploaded(tmp_path):
+    buf = io.BytesIO()
+    sf.write(buf, np.zeros(800), 8000, format="OGG", subtype="VORBIS")
+    digest, _ = store_recording(tmp_path, buf.getvalue(), "vocale.ogg")
+    path = find_recording(tmp_path, digest)
+    assert path.suffix == ".ogg" and path.read_bytes() == buf.getvalue()
@@ -0,0 +1,95 @@
+"""Pre-elaborazione del segnale prima di Praat (parkinson.audio)"""
+
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from parkinson.audio import VAD_PADDING_MS, decode_audio, trim_silence
+
+FS = 16000
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def tone(dur, f0=130, amp=0.2):
+    t = np.arange(int(dur * FS)) / FS
+    return amp * np.sin(2 * np.pi * f0 * t)
+
+
+def quiet(rng, dur):
+    """Silenzio con rumore di fondo a -80 dBFS"""
+    return 1e-4 * rng.standard_normal(int(dur * FS))
+
+
+def test_trim_removes_only_leading_and_trailing_silence(rng):
+    x = np.concatenate([quiet(rng, 0.5), tone(1.0), quiet(rng, 0.4), tone(1.0), quiet(rng, 0.5)])
+    trimmed, durate = trim_silence(x, FS)
+
+    padding = VAD_PADDING_MS / 1000
+    # La pausa interna di 0.4 s resta: voce, pausa, voce e i margini
+    assert len(trimmed) / FS == pytest.approx(2.4 + 2 * padding, abs=0.02)
+    assert durate["n_segmenti"] == 2
+    assert durate["durata_audio"] == pytest.approx(3.4)
+    assert durate["durata_voce"] == pytest.approx(2.0 + 4 * padding, abs=0.02)
+    start = int((0.5 - padding) * FS)
+    np.testing.assert_array_equal(trimmed, x[start:start + len(trimmed)])
+
+
+def test_short_pause_does_not_split_voice(rng):
+    x = np.concatenate([quiet(rng, 0.5), tone(1.0), quiet(rng, 0.1), tone(1.0), quiet(rng, 0.5)])
+    _, durate = trim_silence(x, FS)
+    assert durate["n_segmenti"] == 1
+
+
+def test_channels_trimmed_together(rng):
+    mono = np.concatenate([quiet(rng, 0.5), tone(1.0), quiet(rng, 0.5)])
+    stereo = np.stack([mono, 0.5 * mono])
+    trimmed, _ = trim_silence(stereo, FS)
+    start = int((0.5 - VAD_PADDING_MS / 1000) * FS)
+    np.testing.assert_array_equal(trimmed, stereo[:, start:start + trimmed.shape[1]])
+
+
+def test_signal_shorter_than_a_frame_is_unchanged():
+    x = np.full(100, 0.1)
+    trimmed, durate = trim_silence(x, FS)
+    np.testing.assert_array_equal(trimmed, x)
+    assert durate["n_segmenti"] == 0
+
+
+# ==================== DECODIFICA ====================
+
+def encode(samples, fs, format, subtype):
+    buf = io.BytesIO()
+    sf.write(buf, samples, fs, format=format, subtype=subtype)
+    buf.seek(0)
+    return buf
+
+
+@pytest.mark.parametrize("format, subtype", [("WAV", "PCM_16"), ("FLAC", "PCM_16")])
+def test_decode_stereo_downmix_across_blocks(rng, format, subtype):
+    stereo = np.stack([tone(1.0), quiet(rng, 1.0)], axis=1)
+    source = encode(stereo, FS, format, subtype)
+    expected, _ = sf.read(encode(stereo, FS, format, subtype), dtype="float64")
+
+    # Blocchi piccoli: il downmix avviene blocco per blocco
+    samples, fs = decode_audio(source, block_frames=1000)
+    assert fs == FS
+    np.testing.assert_allclose(samples, expected.mean(axis=1))
+
+
+def test_decode_ogg_vorbis():
+    samples, fs = decode_audio(encode(tone(1.0), FS, "OGG", "VORBIS"))
+    assert fs == FS
+    assert len(samples) == pytest.approx(FS, abs=FS // 100)
+
+
+def test_decode_rewinds_file_objects():
+    source = encode(tone(0.5), FS, "WAV", "PCM_16")
+    first, _ = decode_audio(source)
+    second, _ = decode_audio(source)
+    np.testing.assert_array_equal(first, second)
@@ -0,0 +1,34 @@
+"""Analisi vocale del Backend senza database (parkinson.backend)"""
+
+import pytest
+
+from parkinson.backend import Backend
+from parkinson.timing import NULL_TIMER, StageTimer
+
+
+@pytest.fixture(scope="module")
+def backend():
+    errors = []
+    b = Backend(None, workers=1, on_error=errors.append)
+    b.errors = errors
+    yield b
+    b.pool.shutdown()
+
+
+def test_null_timer_accepts_worker_stages():
+    NULL_TIMER.extend([{"stage": "decode", "seconds": 0.1}], prefix="vocale/")
+    assert NULL_TIMER.stages == ()
+
+
+def test_extract_without_timer(backend, wav_bytes):
+    features = backend.extract_vocal_features({"vocale": wav_bytes})
+    assert backend.errors == []
+    assert set(features) == {"vocale"}
+    assert features["vocale"]["durata_audio"] == pytest.approx(2.0, abs=0.05)
+
+
+def test_extract_with_timer_records_task_stages(backend, wav_bytes):
+    timer = StageTimer()
+    backend.extract_vocal_features({"vocale": wav_bytes}, timer)
+    names = [s["stage"] for s in timer.stages]
+    assert "vocale/decode" in names and "vocale/qualita" in names
@@ -0,0 +1,55 @@
+"""Baseline personale: aggiornamento di Welford e anomalie (parkinson.baseline)"""
+
+import math
+import random
+import statistics
+
+import pytest
+
+from parkinson.baseline import anomalies, measurement_values, update_stats
+
+
+def stats_of(values, feature="jitter"):
+    stats = None
+    for x in values:
+        stats = update_stats(stats, {feature: x})
+    return stats
+
+
+def test_welford_matches_mean_and_sample_std():
+    rng = random.Random(0)
+    xs = [rng.gauss(5, 2) for _ in range(200)]
+    s = stats_of(xs)["jitter"]
+    assert s["n"] == 200
+    assert s["mean"] == pytest.approx(statistics.mean(xs))
+    assert math.sqrt(s["m2"] / (s["n"] - 1)) == pytest.approx(statistics.stdev(xs))
+
+
+def test_update_does_not_modify_previous_stats():
+    before = stats_of([1.0, 2.0])
+    after = update_stats(before, {"jitter": 3.0, "hnr": 20.0})
+    assert before["jitter"]["n"] == 2 and "hnr" not in before
+    assert after["jitter"]["n"] == 3 and after["hnr"] == {"n": 1, "mean": 20.0, "m2": 0.0}
+
+
+def test_measurement_values_skips_missing_and_non_finite():
+    values = measurement_values({"motor_updrs": 20, "jitter": None, "hnr": float("nan"), "note_medico": "x"})
+    assert values == {"motor_updrs": 20.0}
+
+
+def test_anomalies_need_minimum_history():
+    assert anomalies(stats_of([1.0, 1.1]), {"jitter": 100.0}) == []
+
+
+def test_anomalies_sorted_by_distance():
+    stats = {**stats_of([1.0, 1.2, 0.8, 1.1, 0.9]), **stats_of([20.0, 21.0, 19.0, 20.5], "hnr")}
+    found = anomalies(stats, {"jitter": 1.05, "hnr": 5.0, "shimmer": 9.0})
+    assert [a["feature"] for a in found] == ["hnr"]
+    assert found[0]["z"] < -3
+
+    found = anomalies(stats, {"jitter": 50.0, "hnr": 5.0})
+    assert [a["feature"] for a in found] == ["jitter", "hnr"]
+
+
+def test_constant_history_is_not_anomalous():
+    assert anomalies(stats_of([2.0] * 5), {"jitter": 3.0}) == []
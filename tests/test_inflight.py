@@ -0,0 +1,108 @@
+"""Soppressione delle esecuzioni duplicate per chiave (parkinson.inflight.InFlightRegistry)"""
+
+import threading
+import time
+
+import pytest
+
+from parkinson.inflight import InFlightRegistry
+
+
+def blocking(calls, started, release, result="ok"):
+    """Funzione che conta le esecuzioni e resta in corso finché release non è impostato"""
+    def fn():
+        calls.append(1)
+        started.set()
+        assert release.wait(5)
+        return result
+    return fn
+
+
+def test_concurrent_calls_share_one_execution():
+    registry = InFlightRegistry()
+    calls, started, release = [], threading.Event(), threading.Event()
+    fn = blocking(calls, started, release)
+    outcomes = []
+    first = threading.Thread(target=lambda: outcomes.append(registry.run("visita", fn)))
+    first.start()
+    assert started.wait(5)
+    assert registry.in_flight() == 1
+
+    second = threading.Thread(target=lambda: outcomes.append(registry.run("visita", fn)))
+    second.start()
+    time.sleep(0.05)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert len(calls) == 1
+    assert sorted(outcomes, key=lambda o: o[1]) == [("ok", False), ("ok", True)]
+    assert registry.in_flight() == 0
+
+
+def test_completed_result_is_reused_within_ttl():
+    registry = InFlightRegistry(ttl=60)
+    calls = []
+    assert registry.run("k", lambda: calls.append(1) or len(calls)) == (1, True)
+    assert registry.run("k", lambda: calls.append(1) or len(calls)) == (1, False)
+    assert len(calls) == 1
+
+
+def test_different_keys_run_separately():
+    registry = InFlightRegistry()
+    assert registry.run("a", lambda: 1) == (1, True)
+    assert registry.run("b", lambda: 2) == (2, True)
+
+
+def test_result_not_kept_is_forgotten():
+    # Es. un errore restituito come (None, messaggio): la visita si può riprovare
+    registry = InFlightRegistry()
+    keep = lambda result: result[0] is not None
+    assert registry.run("k", lambda: (None, "errore"), keep=keep) == ((None, "errore"), True)
+    assert registry.run("k", lambda: ("salvata", None), keep=keep) == (("salvata", None), True)
+    assert registry.run("k", lambda: ("di nuovo", None), keep=keep) == (("salvata", None), False)
+
+
+def test_exception_is_not_cached():
+    registry = InFlightRegistry()
+
+    def fail():
+        raise RuntimeError("connessione persa")
+
+    with pytest.raises(RuntimeError):
+        registry.run("k", fail)
+    assert registry.run("k", lambda: "ok") == ("ok", True)
+    assert registry.in_flight() == 0
+
+
+def test_waiter_retries_when_owner_fails():
+    registry = InFlightRegistry()
+    started, release = threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        assert release.wait(5)
+        raise RuntimeError("rerun")
+
+    def owner():
+        with pytest.raises(RuntimeError):
+            registry.run("k", fail)
+
+    thread = threading.Thread(target=owner)
+    thread.start()
+    assert started.wait(5)
+    outcome = []
+    waiter = threading.Thread(target=lambda: outcome.append(registry.run("k", lambda: "ok")))
+    waiter.start()
+    time.sleep(0.05)
+    release.set()
+    thread.join(5)
+    waiter.join(5)
+    assert outcome == [("ok", True)]
+
+
+def test_result_expires_after_ttl():
+    registry = InFlightRegistry(ttl=0.05)
+    assert registry.run("k", lambda: 1) == (1, True)
+    time.sleep(0.1)
+    assert registry.run("k", lambda: 2) == (2, True)
@@ -0,0 +1,155 @@
+"""Misure di disfonia in NumPy su segnali con proprietà note (parkinson.measures)"""
+
+import numpy as np
+import pytest
+
+from parkinson.frames import FEATURE_EXTRACTORS, FrameCache, run_extractors
+from parkinson.measures import (
+    MFCC_N_COEFFS, dct_matrix, dfa, dfa_scales, mfcc, ppe, rpde, spectral_tilt, whiten
+)
+from parkinson.timing import StageTimer
+
+FS = 16000
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def logit(p):
+    return np.log(p / (1 - p))
+
+
+# ==================== DFA ====================
+
+def test_dfa_white_noise_has_alpha_one_half(rng):
+    value = dfa(rng.standard_normal(2 * FS), FS)
+    assert value == pytest.approx(1 / (1 + np.exp(-0.5)), abs=0.02)   # ~0.62
+    assert logit(value) == pytest.approx(0.5, abs=0.1)
+
+
+def test_dfa_brown_noise_has_alpha_three_halves(rng):
+    value = dfa(np.cumsum(rng.standard_normal(2 * FS)), FS)
+    assert value == pytest.approx(1 / (1 + np.exp(-1.5)), abs=0.02)   # ~0.82
+    assert logit(value) == pytest.approx(1.5, abs=0.1)
+
+
+def test_dfa_scales_independent_of_sampling_frequency():
+    # Stesse scale in ms (1-10 ms) a qualsiasi frequenza
+    assert dfa_scales(16000, FS)[[0, -1]].tolist() == [16, 160]
+    assert dfa_scales(44100, FS)[[0, -1]].tolist() == [44, 441]
+
+
+def test_dfa_degenerate_signals(rng):
+    assert dfa(rng.standard_normal(10), FS) == 0.0     # troppo corto per due scale
+    assert dfa(np.zeros(FS), FS) == 0.0                # nessuna fluttuazione
+
+
+# ==================== PPE ====================
+
+def jittered_pitch(rng, semitones_sd, n=300, f0=150.0):
+    return f0 * 2 ** (rng.normal(0, semitones_sd, n) / 12)
+
+
+def test_ppe_invariant_to_constant_pitch_shift(rng):
+    f0 = jittered_pitch(rng, 0.2)
+    # Un'ottava, una quinta o un riferimento per sesso spostano solo la media in semitoni
+    for factor in (0.5, 1.5, 2.0):
+        assert ppe(f0 * factor) == pytest.approx(ppe(f0), abs=1e-9)
+
+
+def test_ppe_ignores_unvoiced_frames(rng):
+    f0 = jittered_pitch(rng, 0.2)
+    with_gaps = np.insert(f0, [10, 100, 200], [0.0, np.nan, 0.0])
+    assert ppe(with_gaps) == ppe(f0)
+
+
+def test_ppe_grows_with_pitch_irregularity(rng):
+    assert ppe(np.full(300, 150.0)) == 0.0
+    assert 0 < ppe(jittered_pitch(rng, 0.2)) < ppe(jittered_pitch(rng, 1.0)) < 1
+
+
+def test_ppe_short_contour_is_zero():
+    assert ppe([150.0, 151.0, 0.0, 149.0, 150.0]) == 0.0
+
+
+def test_whiten_recovers_ar_innovations(rng):
+    innovations = rng.standard_normal(2000)
+    series = np.zeros(2000)
+    for i in range(2, 2000):
+        series[i] = 1.2 * series[i - 1] - 0.5 * series[i - 2] + innovations[i]
+    residuals = whiten(series)
+    assert np.corrcoef(residuals, innovations[2:])[0, 1] > 0.99
+
+
+# ==================== RPDE ====================
+
+def test_rpde_orders_periodic_noisy_and_random_signals(rng):
+    t = np.arange(FS) / FS
+    sine = np.sin(2 * np.pi * 150 * t)
+    # Un solo periodo di ricorrenza: entropia nulla; rumore bianco: quasi massima
+    assert rpde(sine, FS) == 0.0
+    assert 0 < rpde(sine + 0.05 * rng.standard_normal(FS), FS) < rpde(rng.standard_normal(FS), FS)
+    assert rpde(rng.standard_normal(FS), FS) > 0.8
+
+
+def test_rpde_degenerate_signals():
+    assert rpde(np.zeros(FS), FS) == 0.0
+    assert rpde(np.ones(100), FS) == 0.0   # più corto di T_max
+
+
+# ==================== SPETTRO: MFCC E TILT ====================
+
+def colored_noise(rng, beta):
+    """Rumore con spettro di potenza 1/f^beta (pendenza -3 * beta dB/ottava)"""
+    spectrum = np.fft.rfft(rng.standard_normal(FS))
+    f = np.fft.rfftfreq(FS)
+    f[0] = f[1]
+    return np.fft.irfft(spectrum / f ** (beta / 2), FS)
+
+
+@pytest.mark.parametrize("beta", [0, 1, 2])
+def test_spectral_tilt_of_colored_noise(rng, beta):
+    cache = FrameCache(colored_noise(rng, beta), FS)
+    assert spectral_tilt(cache.power, cache.freqs) == pytest.approx(-3.0 * beta, abs=0.3)
+
+
+def test_mfcc_gain_changes_only_c0(rng):
+    x = rng.standard_normal(FS)
+    quiet, loud = FrameCache(x, FS), FrameCache(10 * x, FS)
+    a = mfcc(quiet.power, quiet.n_fft, FS)
+    b = mfcc(loud.power, loud.n_fft, FS)
+    assert len(a) == MFCC_N_COEFFS
+    assert b[0] > a[0]
+    np.testing.assert_allclose(b[1:], a[1:], atol=1e-6)
+
+
+def test_dct_matrix_is_orthonormal():
+    basis = dct_matrix(13, 26)
+    np.testing.assert_allclose(basis @ basis.T, np.eye(13), atol=1e-12)
+
+
+def test_spectral_measures_on_empty_frames():
+    cache = FrameCache(np.zeros(10), FS)
+    assert mfcc(cache.power, cache.n_fft, FS) == [0.0] * MFCC_N_COEFFS
+    assert spectral_tilt(cache.power, cache.freqs) == 0.0
+
+
+# ==================== CACHE DEI FRAME ====================
+
+def test_extractors_share_one_spectrum(rng, monkeypatch):
+    calls = []
+    rfft = np.fft.rfft
+    monkeypatch.setattr(np.fft, "rfft", lambda *args, **kwargs: calls.append(1) or rfft(*args, **kwargs))
+
+    cache = FrameCache(rng.standard_normal(FS), FS, f0=np.full(100, 150.0))
+    timer = StageTimer()
+    features = run_extractors(cache, timer=timer)
+
+    assert set(features) == {"dfa", "ppe", "rpde", "mfcc", "spectral_tilt"}
+    assert [s["stage"] for s in timer.stages] == list(FEATURE_EXTRACTORS)
+    # STFT calcolata una volta e riusata da MFCC e tilt
+    assert len(calls) == 1
+    assert run_extractors(cache, names={"spectral_tilt"}) == {"spectral_tilt": features["spectral_tilt"]}
+    assert len(calls) == 1
@@ -0,0 +1,111 @@
+"""Copia locale e coda delle scritture con connessione instabile (parkinson.mirror)"""
+
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from parkinson.backend import Backend
+from parkinson.mirror import MirroredBackend
+
+CF = "RSSMRA80A01H501U"
+
+
+class FakeQuery:
+    """Query PostgREST concatenabile: righe fisse della tabella, errore se il client è offline"""
+
+    def __init__(self, client, tabella):
+        self.client = client
+        self.tabella = tabella
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        if self.client.down:
+            raise ConnectionError("connessione rifiutata")
+        self.client.calls.append(self.tabella)
+        return SimpleNamespace(data=self.client.tables.get(self.tabella, []))
+
+
+class FakeSupabase:
+    def __init__(self, tables=None):
+        self.tables = tables or {}
+        self.down = False
+        self.calls = []
+
+    def table(self, tabella):
+        return FakeQuery(self, tabella)
+
+    def rpc(self, name, params):
+        return FakeQuery(self, name)
+
+
+@pytest.fixture
+def supabase():
+    return FakeSupabase({"patients": [{"codice_fiscale": CF, "doctor_username": "medico"}]})
+
+
+@pytest.fixture
+def mirror(supabase, tmp_path):
+    backend = Backend(supabase, archive_dir=str(tmp_path / "archivio"), workers=1)
+    m = MirroredBackend(backend, str(tmp_path / "mirror.db"))
+    m.store.put_patients([{"codice_fiscale": CF, "doctor_username": "medico", "nome": "Mario"}])
+    m.store.put_measurements([{"id": 1, "codice_fiscale": CF, "timestamp": "2024-01-01T10:00:00", "note_medico": None}])
+    yield m
+    backend.pool.shutdown()
+
+
+def test_note_is_direct_when_online(mirror, supabase):
+    assert mirror.add_note(CF, "2024-01-01T10:00:00", "stabile", "medico") == (True, "Nota salvata")
+    assert mirror.pending_count() == 0
+
+
+def test_note_queued_when_connection_drops_between_checks(mirror, supabase):
+    # Ultimo controllo riuscito, connessione caduta subito dopo
+    supabase.down = True
+    ok, message = mirror.add_note(CF, "2024-01-01T10:00:00", "stabile", "medico")
+
+    assert ok and "sarà inviata" in message
+    assert not mirror.connected()
+    assert [kind for _, kind, _, _ in mirror.store.pending()] == ["nota"]
+    assert mirror.store.measurements([CF])[0]["note_medico"] == "stabile"
+
+    # Al ritorno della connessione la coda viene inviata
+    supabase.down = False
+    mirror.flush()
+    assert mirror.pending_count() == 0
+
+
+def test_database_error_is_not_queued(mirror, supabase):
+    # Connessione attiva ma paziente non del medico (nessuna riga): errore restituito, niente coda
+    supabase.tables["patients"] = []
+    assert mirror.add_note(CF, "2024-01-01T10:00:00", "stabile", "medico") == (False, "Non autorizzato")
+    assert mirror.connected()
+    assert mirror.pending_count() == 0
+
+
+def test_visit_queued_when_connection_drops_between_checks(mirror, supabase, wav_bytes):
+    supabase.down = True
+    upload = io.BytesIO(wav_bytes)
+    upload.name = "vocale.wav"
+    result, error = mirror.process_visit(CF, {"vocale": upload})
+
+    assert error is None and result["in_coda"]
+    assert [kind for _, kind, _, _ in mirror.store.pending()] == ["visita"]
+    provvisorie = [m for m in mirror.store.measurements([CF]) if m.get("in_coda")]
+    assert len(provvisorie) == 1 and provvisorie[0]["motor_updrs"] == result["motor_UPDRS"]
+
+
+def test_local_history_page_is_bounded(mirror):
+    mirror.store.put_measurements([
+        {"id": i, "codice_fiscale": CF, "timestamp": f"2024-{1 + i // 28:02d}-{1 + i % 28:02d}T09:00:00",
+         "motor_updrs": float(i), "note_medico": None}
+        for i in range(2, 60)
+    ])
+    serie, righe, totale = mirror.get_history_page(CF, bucket="mese", columns="timestamp, motor_updrs", page=1,
+                                                   page_size=10)
+    assert totale == 59
+    assert [r["motor_updrs"] for r in righe] == [float(i) for i in range(49, 39, -1)]
+    assert set(righe[0]) == {"timestamp", "motor_updrs"}
+    assert [b["n"] for b in serie] == [27, 28, 4]
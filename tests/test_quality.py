@@ -0,0 +1,102 @@
+"""Controllo qualità delle registrazioni con soglie per task (parkinson.audio.check_quality)"""
+
+import numpy as np
+import pytest
+
+from parkinson.audio import QC_TASK_THRESHOLDS, check_quality
+
+FS = 16000
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def vowel(rng, dur, f0=130, amp=0.2):
+    """Vocale sostenuta sintetica: armoniche di f0 con un po' di jitter"""
+    f = f0 + rng.normal(0, 0.5, int(dur * FS))
+    phase = 2 * np.pi * np.cumsum(f) / FS
+    return amp * sum(np.sin(k * phase) / k ** 1.2 for k in range(1, 20))
+
+
+def with_pauses(rng, segment, noise, repeats=4):
+    """Segmenti di 1 s preceduti da 0.5 s di pausa, con rumore di fondo costante"""
+    x = np.concatenate([np.concatenate([np.zeros(FS // 2), segment(1.0)]) for _ in range(repeats)])
+    return x + noise * rng.standard_normal(x.size)
+
+
+def test_clean_vowel_passes(rng):
+    report = check_quality(vowel(rng, 3), FS)
+    assert report["errori"] == [] and report["avvisi"] == []
+    assert report["frazione_voce"] > 0.9
+
+
+def test_sustained_vowel_without_pauses_has_no_snr(rng):
+    # Nessuna finestra non vocalizzata: il rumore non si stima e non si rifiuta
+    assert check_quality(vowel(rng, 3), FS)["snr_db"] is None
+
+
+@pytest.mark.parametrize("task", ["vocale", "ddk", "lettura"])
+def test_minimum_duration_per_task(rng, task):
+    minimum = QC_TASK_THRESHOLDS[task]["durata_min"]
+    short = check_quality(vowel(rng, minimum - 0.2), FS, task)
+    assert len(short["errori"]) == 1 and "troppo breve" in short["errori"][0]
+    assert check_quality(vowel(rng, minimum + 0.5), FS, task)["errori"] == []
+
+
+def test_silent_recording_is_rejected(rng):
+    report = check_quality(1e-5 * rng.standard_normal(3 * FS), FS)
+    assert "muta" in report["errori"][0]
+
+
+def test_low_level_is_a_warning(rng):
+    report = check_quality(vowel(rng, 3, amp=0.005), FS)
+    assert report["errori"] == []
+    assert any("livello" in a for a in report["avvisi"])
+
+
+def test_clipped_recording_is_rejected(rng):
+    report = check_quality(np.clip(vowel(rng, 3) * 8, -1, 1), FS)
+    assert any("saturato" in e for e in report["errori"])
+
+
+def test_noise_only_is_rejected(rng):
+    report = check_quality(0.2 * rng.standard_normal(3 * FS), FS)
+    assert report["snr_db"] < QC_TASK_THRESHOLDS["vocale"]["snr_rifiuto"]
+    assert any("rumore" in e for e in report["errori"])
+
+
+def test_short_voice_after_silence_is_insufficient(rng):
+    x = np.concatenate([1e-4 * rng.standard_normal(int(2.7 * FS)), vowel(rng, 0.3)])
+    report = check_quality(x, FS)
+    assert report["errori"] and "voce insufficiente" in report["errori"][0]
+
+
+def test_background_noise_estimated_from_pauses(rng):
+    clean = check_quality(with_pauses(rng, lambda d: vowel(rng, d), 0.001), FS)
+    noisy = check_quality(with_pauses(rng, lambda d: vowel(rng, d), 0.08), FS)
+    assert clean["snr_db"] > 30 and clean["avvisi"] == []
+    assert noisy["errori"] == []
+    assert any("rumore di fondo" in a for a in noisy["avvisi"])
+
+
+def test_snr_thresholds_depend_on_task(rng):
+    # ~13 dB: accettabile per la vocale, avviso per la DDK (soglia 15 dB)
+    x = with_pauses(rng, lambda d: vowel(rng, d), 0.04)
+    assert check_quality(x, FS, "vocale")["avvisi"] == []
+    assert any("rumore di fondo" in a for a in check_quality(x, FS, "ddk")["avvisi"])
+
+
+def test_aperiodic_voice_is_only_a_warning(rng):
+    # Voce soffiata/disfonica: energia alta ma poca periodicità, non va rifiutata
+    breathy = with_pauses(rng, lambda d: 0.3 * vowel(rng, d) + 0.1 * rng.standard_normal(int(d * FS)), 0.001)
+    report = check_quality(breathy, FS)
+    assert report["errori"] == []
+    assert report["frazione_voce"] < QC_TASK_THRESHOLDS["vocale"]["periodica_avviso"]
+    assert any("poco periodica" in a for a in report["avvisi"])
+
+
+def test_unknown_task_raises(rng):
+    with pytest.raises(KeyError):
+        check_quality(vowel(rng, 3), FS, "sconosciuto")
@@ -0,0 +1,142 @@
+"""Rianalisi delle registrazioni archiviate con versione di estrazione obsoleta (parkinson.reanalysis)"""
+
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from parkinson.archive import store_recording
+from parkinson.features import extraction_version
+from parkinson.reanalysis import fetch_stale_measurements, recording_tasks, run
+
+VERSION = extraction_version(16000)
+
+
+class FakeQuery:
+    """
+    Sottoinsieme di PostgREST usato dal job: i filtri sono applicati davvero,
+    così il test verifica quali misurazioni vengono selezionate.
+    """
+
+    def __init__(self, db, tabella):
+        self.db = db
+        self.tabella = tabella
+        self.filters = []
+        self.negate = False
+        self.n = None
+        self.rows = None
+
+    @property
+    def not_(self):
+        self.negate = True
+        return self
+
+    def select(self, columns):
+        return self
+
+    def is_(self, column, value):
+        negate, self.negate = self.negate, False
+        self.filters.append(lambda r: (r.get(column) is None) != negate)
+        return self
+
+    def or_(self, condition):
+        # Solo la forma del job: "col.is.null,col.neq.<valore>"
+        column, value = re.fullmatch(r"(\w+)\.is\.null,\1\.neq\.(.+)", condition).groups()
+        self.filters.append(lambda r: r.get(column) is None or r[column] != value)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda r: r[column] > value)
+        return self
+
+    def order(self, column):
+        self.db["_requests"] = self.db.get("_requests", 0) + 1
+        return self
+
+    def limit(self, n):
+        self.n = n
+        return self
+
+    def upsert(self, rows):
+        self.rows = rows
+        return self
+
+    def execute(self):
+        if self.rows is not None:
+            self.db.setdefault(f"{self.tabella}_upsert", []).extend(self.rows)
+            return SimpleNamespace(data=self.rows)
+        data = [r for r in self.db.get(self.tabella, []) if all(f(r) for f in self.filters)]
+        if self.tabella == "measurements":
+            data = sorted(data, key=lambda r: r["id"])[:self.n]
+        return SimpleNamespace(data=data)
+
+
+class FakeSupabase:
+    def __init__(self, db):
+        self.db = db
+
+    def table(self, tabella):
+        return FakeQuery(self.db, tabella)
+
+
+def measurement(id, audio_hash, version=None, task_features=None):
+    return {"id": id, "codice_fiscale": "RSSMRA80A01H501U", "timestamp": f"2024-01-{id:02d}T10:00:00",
+            "audio_hash": audio_hash, "extraction_version": version, "task_features": task_features}
+
+
+def test_fetch_selects_only_stale_measurements_with_audio():
+    db = {"measurements": [
+        measurement(1, "a"),                    # mai analizzata con versione
+        measurement(2, "b", "v1-vecchia"),      # versione obsoleta
+        measurement(3, "c", VERSION),           # già aggiornata
+        measurement(4, None, "v1-vecchia"),     # senza audio archiviato
+        measurement(5, "e", "v1-vecchia"),
+    ]}
+    stale = fetch_stale_measurements(FakeSupabase(db), VERSION, page_size=2)
+    assert [m["id"] for m in stale] == [1, 2, 5]
+    # Paginazione per id: una pagina piena e una parziale
+    assert db["_requests"] == 2
+
+
+def test_recording_tasks_maps_each_hash_to_its_task():
+    m = measurement(1, "a", task_features={
+        "vocale": {"audio_hash": "a"}, "ddk": {"audio_hash": "d"}, "lettura": {"audio_hash": None}
+    })
+    assert recording_tasks(m) == {"a": "vocale", "d": "ddk"}
+    assert recording_tasks(measurement(2, "x")) == {"x": "vocale"}
+
+
+def test_run_reanalyzes_missing_results_and_rewrites_rows(tmp_path, wav_bytes, capsys):
+    archived, _ = store_recording(tmp_path, wav_bytes, "vocale.wav")
+    memo_features = {"jitter_abs": 1e-5, "shimmer_local": 0.02, "hnr": 20.0, "nhr": 0.01, "dfa": 0.7, "ppe": 0.2}
+    db = {
+        "measurements": [
+            measurement(1, "in-memo", "v1-vecchia"),
+            measurement(2, archived, "v1-vecchia", {"vocale": {"audio_hash": archived, "motor_updrs": 1.0}}),
+            measurement(3, "file-mancante", "v1-vecchia"),
+            measurement(4, archived, VERSION),
+        ],
+        # Risultato di un'esecuzione interrotta: non va ricalcolato
+        "feature_memo": [
+            {"audio_hash": "in-memo", "extraction_version": VERSION, "features": memo_features, "motor_updrs": 12.5}
+        ],
+    }
+
+    run(FakeSupabase(db), tmp_path, workers=1)
+
+    assert [r["audio_hash"] for r in db["feature_memo_upsert"]] == [archived]
+    rows = {r["id"]: r for r in db["measurements_upsert"]}
+    assert sorted(rows) == [1, 2]   # la 3 resta obsoleta finché manca il file
+    assert all(r["extraction_version"] == VERSION for r in rows.values())
+    assert rows[1]["motor_updrs"] == 12.5 and rows[1]["task_features"] is None
+    assert rows[2]["task_features"]["vocale"]["audio_hash"] == archived
+    assert rows[2]["motor_updrs"] == pytest.approx(rows[2]["task_features"]["vocale"]["motor_updrs"])
+    assert "file mancanti: 1" in capsys.readouterr().out
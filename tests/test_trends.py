@@ -0,0 +1,78 @@
+"""Andamento UPDRS: coppie Theil-Sen e stime per paziente (parkinson.trends)"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from parkinson.trends import DAYS_PER_MONTH, _pairs, patient_trends
+
+
+def rows(codice_fiscale, points, start=datetime(2024, 1, 1)):
+    """Misurazioni da coppie (giorni dall'inizio, UPDRS)"""
+    return [
+        {"codice_fiscale": codice_fiscale, "timestamp": (start + timedelta(days=d)).isoformat(), "motor_updrs": u}
+        for d, u in points
+    ]
+
+
+def test_pairs_enumerates_all_pairs_within_each_group():
+    i, j = _pairs(np.array([3, 1, 2]))
+    assert list(zip(i.tolist(), j.tolist())) == [(0, 1), (0, 2), (1, 2), (4, 5)]
+
+
+def test_pairs_empty_and_singleton_groups():
+    i, j = _pairs(np.array([1, 0, 1]))
+    assert i.size == 0 and j.size == 0
+
+
+def test_linear_history_gives_exact_slope():
+    # 2 punti UPDRS al mese per sei mesi
+    points = [(m * DAYS_PER_MONTH, 20 + 2 * m) for m in range(7)]
+    [trend] = patient_trends(rows("A", points))
+    assert trend["pendenza_theil_sen"] == pytest.approx(2.0)
+    assert trend["pendenza_mensile"] == pytest.approx(2.0)
+    assert trend["trend"] == "peggioramento"
+    assert trend["n_misurazioni"] == 7
+    assert trend["variazione"] == pytest.approx(12.0)
+
+
+def test_theil_sen_ignores_a_single_outlier():
+    points = [(m * DAYS_PER_MONTH, 20.0) for m in range(8)]
+    points[4] = (points[4][0], 60.0)
+    [trend] = patient_trends(rows("A", points))
+    assert trend["pendenza_theil_sen"] == pytest.approx(0.0)
+    assert trend["trend"] == "stabile"
+
+
+def test_same_day_repeats_do_not_give_slopes():
+    # Visita ripetuta dopo pochi secondi con UPDRS diverso
+    points = [(m * DAYS_PER_MONTH, 30 - m) for m in range(4)] + [(3 * DAYS_PER_MONTH + 1e-4, 10.0)]
+    [trend] = patient_trends(rows("A", points))
+    assert abs(trend["pendenza_theil_sen"]) < 5
+    assert trend["trend"] == "miglioramento"
+
+
+def test_short_history_has_no_trend():
+    [trend] = patient_trends(rows("A", [(0, 20.0), (0.001, 35.0), (2, 21.0)]))
+    assert trend["pendenza_theil_sen"] is None
+    assert trend["pendenza_mensile"] is None
+    assert trend["trend"] is None
+    assert trend["n_misurazioni"] == 3
+
+
+def test_patients_sorted_by_slope_and_missing_values_dropped():
+    data = (
+        rows("STABILE", [(m * DAYS_PER_MONTH, 20.0) for m in range(4)])
+        + rows("PEGGIORA", [(m * DAYS_PER_MONTH, 20 + 3 * m) for m in range(4)])
+        + rows("SINGOLA", [(0, 25.0)])
+        + [{"codice_fiscale": "STABILE", "timestamp": "2024-02-15T00:00:00", "motor_updrs": None}]
+    )
+    trends = patient_trends(data)
+    assert [t["codice_fiscale"] for t in trends] == ["PEGGIORA", "STABILE", "SINGOLA"]
+    assert trends[1]["n_misurazioni"] == 4
+    assert trends[2]["trend"] is None
+
+
+def test_no_rows():
+    assert patient_trends([]) == []